@@ -0,0 +1,234 @@
+# src/batch_render.py
+import argparse
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+from chord_generator import generate_progression_bytes, progression_from_romans
+from constants import CHORD_DB, SCALE_MAP
+from rhythm.types import RHYTHM_TYPES
+
+logger = logging.getLogger(__name__)
+
+CHORD_STYLES = ['block', 'arpeggio']
+
+# 每个渲染进程同时排队的工作单元数，已提交但未取回的结果占用的内存与此成正比
+CHUNKS_PER_WORKER = 2
+
+@dataclass(frozen=True)
+class RenderJob:
+    style: str          # CHORD_DB中的风格
+    progression: str    # 风格下的和弦进行名称
+    key: str
+    bpm: int
+    rhythm: str
+    chord_style: str    # block / arpeggio
+    duration: float = 1.0
+
+def iter_jobs(styles: Sequence[str], progressions: Optional[Sequence[str]], keys: Sequence[str],
+              bpms: Sequence[int], rhythms: Sequence[str], chord_styles: Sequence[str],
+              duration: float = 1.0) -> Iterator[RenderJob]:
+    """按笛卡尔积产生渲染任务，progressions为None时使用风格下的全部进行"""
+    for style in styles:
+        names = [name for name in CHORD_DB[style] if progressions is None or name in progressions]
+        for name, key, bpm, rhythm, chord_style in itertools.product(names, keys, bpms, rhythms, chord_styles):
+            yield RenderJob(style, name, key, bpm, rhythm, chord_style, duration)
+
+def render_job(job: RenderJob) -> bytes:
+    """渲染单个任务为标准MIDI文件字节"""
+    progression = progression_from_romans(CHORD_DB[job.style][job.progression], job.duration, job.rhythm)
+    return generate_progression_bytes(progression, job.key, job.bpm, job.chord_style, job.rhythm)
+
+def _safe_name(name: str) -> str:
+    """替换文件名中的非法字符"""
+    return re.sub(r'[<>:"/\\|?*\s]', '_', name)
+
+def job_path(out_dir: str, job: RenderJob) -> str:
+    """任务对应的输出路径：<输出目录>/<风格>/<进行>/<调>_<速度>bpm_<节奏>_<演奏方式>.mid"""
+    filename = f"{job.key}_{job.bpm}bpm_{job.rhythm}_{job.chord_style}.mid"
+    return os.path.join(out_dir, _safe_name(job.style), _safe_name(job.progression), filename)
+
+def write_job(out_dir: str, job: RenderJob, data: bytes) -> str:
+    """写入渲染结果并返回文件路径"""
+    path = job_path(out_dir, job)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    written: int = 0
+    failures: List[Tuple[RenderJob, str]] = field(default_factory=list)
+
+    def report(self) -> str:
+        """生成失败汇总文本"""
+        lines = [f"完成: {self.written}/{self.total} 个文件已写入, 失败 {len(self.failures)} 个"]
+        for job, error in self.failures:
+            lines.append(f"  {job.style}/{job.progression} {job.key} {job.bpm}bpm "
+                         f"{job.rhythm} {job.chord_style}: {error}")
+        return "\n".join(lines)
+
+# 工作进程的返回结果: (任务, MIDI字节, 错误信息)
+ChunkResult = List[Tuple[RenderJob, Optional[bytes], Optional[str]]]
+
+def _render_chunk(chunk: List[RenderJob]) -> ChunkResult:
+    """在工作进程中渲染一组任务，单个任务失败不影响同组其他任务"""
+    results = []
+    for job in chunk:
+        try:
+            results.append((job, render_job(job), None))
+        except Exception as e:
+            results.append((job, None, f"{type(e).__name__}: {e}"))
+    return results
+
+def _chunks(jobs: Sequence[RenderJob], chunk_size: int) -> Iterator[List[RenderJob]]:
+    for start in range(0, len(jobs), chunk_size):
+        yield list(jobs[start:start + chunk_size])
+
+def render_parallel(jobs: Sequence[RenderJob], out_dir: str, workers: Optional[int] = None,
+                    chunk_size: int = 64, max_pending_writes: int = 256, write_threads: int = 4,
+                    progress: Optional[Callable[[int, int], None]] = None) -> BatchSummary:
+    """用进程池并行渲染任务，主进程以有限并发写入文件
+
+    workers为None时使用全部CPU核心；为1时在当前进程中顺序渲染。
+    同时提交给进程池的工作单元数和已渲染但尚未写盘的文件数都有上限，
+    内存占用与任务总数无关。
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size必须为正数: {chunk_size}")
+    if workers is not None and workers < 1:
+        raise ValueError(f"workers必须为正数: {workers}")
+    summary = BatchSummary(total=len(jobs))
+    lock = threading.Lock()
+    pending = threading.BoundedSemaphore(max_pending_writes)
+    done = 0
+
+    def finish(job: RenderJob, error: Optional[str]):
+        nonlocal done
+        with lock:
+            if error is None:
+                summary.written += 1
+            else:
+                summary.failures.append((job, error))
+            done += 1
+            if progress:
+                progress(done, summary.total)
+
+    def write(job: RenderJob, data: bytes):
+        try:
+            write_job(out_dir, job, data)
+            finish(job, None)
+        except Exception as e:
+            finish(job, f"{type(e).__name__}: {e}")
+        finally:
+            pending.release()
+
+    def collect(results: ChunkResult, writer: ThreadPoolExecutor):
+        for job, data, error in results:
+            if error is not None:
+                finish(job, error)
+                continue
+            pending.acquire()
+            writer.submit(write, job, data)
+
+    with ThreadPoolExecutor(max_workers=write_threads) as writer:
+        if workers == 1:
+            for chunk in _chunks(jobs, chunk_size):
+                collect(_render_chunk(chunk), writer)
+        else:
+            window = (workers or os.cpu_count() or 1) * CHUNKS_PER_WORKER
+            chunks = _chunks(jobs, chunk_size)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {}
+                while True:
+                    for chunk in itertools.islice(chunks, window - len(futures)):
+                        futures[pool.submit(_render_chunk, chunk)] = chunk
+                    if not futures:
+                        break
+                    completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        # 取出后不再引用该future，结果交给写线程后即可释放
+                        chunk = futures.pop(future)
+                        try:
+                            results = future.result()
+                        except Exception as e:
+                            # 工作进程异常退出时整组任务记为失败
+                            results = [(job, None, f"{type(e).__name__}: {e}") for job in chunk]
+                        collect(results, writer)
+
+    # 按任务顺序排列失败列表，保证汇总结果可复现
+    order = {job: i for i, job in enumerate(jobs)}
+    summary.failures.sort(key=lambda item: order.get(item[0], 0))
+    return summary
+
+def _positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"必须为正整数: {text}")
+    return value
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="批量生成和弦进行MIDI文件（无需图形界面）")
+    parser.add_argument('-o', '--out', default='midi_corpus', help="输出目录")
+    parser.add_argument('--styles', nargs='+', default=list(CHORD_DB), help="CHORD_DB中的风格，默认全部")
+    parser.add_argument('--progressions', nargs='+', help="和弦进行名称，默认所选风格下的全部")
+    parser.add_argument('--keys', nargs='+', default=list(SCALE_MAP), help="调，默认全部")
+    parser.add_argument('--bpms', nargs='+', type=_positive_int, default=[120], help="速度列表")
+    parser.add_argument('--rhythms', nargs='+', default=list(RHYTHM_TYPES), help="节奏型，默认全部")
+    parser.add_argument('--chord-styles', nargs='+', default=CHORD_STYLES, choices=CHORD_STYLES,
+                        help="柱式(block)/分解(arpeggio)和弦")
+    parser.add_argument('--duration', type=float, default=1.0, help="每个和弦的时值（小节）")
+    parser.add_argument('-j', '--workers', type=_positive_int, default=None, help="渲染进程数，默认使用全部CPU核心")
+    parser.add_argument('--chunk-size', type=_positive_int, default=64, help="每个工作单元包含的任务数")
+    return parser
+
+def parse_jobs(argv: Optional[List[str]] = None):
+    """解析命令行参数，返回 (参数, 任务列表)"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # 和弦进行名称取决于所选风格，无法直接用choices限定
+    progressions = {name for style in args.styles for name in CHORD_DB.get(style, ())}
+    for option, values, valid in (
+        ('--styles', args.styles, CHORD_DB),
+        ('--progressions', args.progressions or [], progressions),
+        ('--keys', args.keys, SCALE_MAP),
+        ('--rhythms', args.rhythms, RHYTHM_TYPES),
+    ):
+        unknown = [value for value in values if value not in valid]
+        if unknown:
+            parser.error(f"{option} 中的未知取值: {', '.join(unknown)}")
+
+    jobs = list(iter_jobs(args.styles, args.progressions, args.keys, args.bpms,
+                          args.rhythms, args.chord_styles, args.duration))
+    if not jobs:
+        parser.error("没有匹配的渲染任务")
+    return args, jobs
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    args, jobs = parse_jobs(argv)
+
+    step = max(1, len(jobs) // 20)
+
+    def progress(done: int, total: int):
+        if done % step == 0 or done == total:
+            logger.info(f"进度: {done}/{total}")
+
+    summary = render_parallel(jobs, args.out, workers=args.workers,
+                              chunk_size=args.chunk_size, progress=progress)
+    if summary.failures:
+        logger.error(summary.report())
+    else:
+        logger.info(summary.report())
+    return 1 if summary.failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,14 @@
 from mido import MidiFile, MidiTrack, Message, MetaMessage, bpm2tempo
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from constants import (
     CHORD_DB, SCALE_MAP, CHORD_TYPES, NOTE_NAMES,
     ROMAN_TO_DEGREE, CHORD_TYPE_DISPLAY
 )
 from custom_types import ChordConfig, ChordStyle
 from rhythm.handler import RhythmHandler
+from note_events import NoteEventBuffer
+from smf_writer import encode_smf
+from functools import lru_cache
 import re
 import logging
 
@@ -15,66 +18,52 @@ def get_note_name(note_value: int) -> str:
     """获取音符名称"""
     return NOTE_NAMES[note_value % 12]
 
-def chord_to_name(key: str, roman_numeral: str, chord_type: str) -> str:
-    """将罗马数字和弦转换为实际和弦名称"""
-    # 检查是否有特殊后缀如(min7b5)
-    special_types = {
-        '(min)': 'min',
-        '(min7)': 'm7',
-        '(maj7)': 'maj7',
-        '(7)': '7',
-        '(sus4)': 'sus4',
-        '(min7b5)': 'm7b5',
-        '(b9)': '7b9'
-    }
-    
-    actual_type = chord_type
-    cleaned_roman = roman_numeral.upper()
-    
-    # 修复：使用统一的大小写处理
-    for suffix, ctype in special_types.items():
-        suffix_upper = suffix.upper()
-        if suffix_upper in cleaned_roman:
-            actual_type = ctype
-            cleaned_roman = cleaned_roman.replace(suffix_upper, "")
-            break
-    
-    # 确保罗马数字是有效的（去除空格）
-    cleaned_roman = cleaned_roman.strip()
-    
-    # 检查清理后的罗马数字是否在映射表中
-    if cleaned_roman not in ROMAN_TO_DEGREE:
-        # 尝试从和弦名称中提取罗马数字部分
-        match = re.match(r'([IV]+)', cleaned_roman)
-        if match:
-            cleaned_roman = match.group(1)
-        else:
-            logger.error(f"无效的罗马数字: {cleaned_roman} (原始输入: {roman_numeral})")
-            return ""  # 返回空字符串避免崩溃
-    
-    root_idx = ROMAN_TO_DEGREE[cleaned_roman]
-    root_note = SCALE_MAP[key][root_idx]
-    root_name = get_note_name(root_note)
-    
-    return f"{root_name}{CHORD_TYPE_DISPLAY.get(actual_type, '')}"
+# 特殊后缀到和弦类型的映射，如 II(min7b5)
+SPECIAL_TYPES = {
+    '(min)': 'min',
+    '(min7)': 'm7',
+    '(maj7)': 'maj7',
+    '(7)': '7',
+    '(sus4)': 'sus4',
+    '(min7b5)': 'm7b5',
+    '(b9)': '7b9'
+}
 
-def chord_to_notes(key: str, roman_numeral: str, chord_type: str, inversion: int = 0) -> List[int]:
-    """将罗马数字和弦转换为实际音符"""
-    special_types = {
-        '(min)': 'min',
-        '(min7)': 'm7',
-        '(maj7)': 'maj7',
-        '(7)': '7',
-        '(sus4)': 'sus4',
-        '(min7b5)': 'm7b5',
-        '(b9)': '7b9'
-    }
-    
+# MIDI文件默认精度
+DEFAULT_TICKS_PER_BEAT = 480
+
+# 非标准和弦符号解析结果的缓存上限
+FALLBACK_CACHE_SIZE = 512
+
+def _voice(root_note: int, offsets: List[int], inversion: int) -> Tuple[int, ...]:
+    """按转位排列和弦音"""
+    notes = [root_note + offset for offset in offsets]
+    return tuple(notes[inversion:] + [n + 12 for n in notes[:inversion]])
+
+def _build_voicing_table() -> Dict[Tuple[str, str, str, int], Tuple[Tuple[int, ...], str]]:
+    """预先编译所有 (调, 罗马数字, 和弦类型, 转位) 的音符与和弦名称"""
+    table = {}
+    for key, scale in SCALE_MAP.items():
+        for roman, degree in ROMAN_TO_DEGREE.items():
+            root_note = scale[degree]
+            root_name = get_note_name(root_note)
+            for chord_type, offsets in CHORD_TYPES.items():
+                name = f"{root_name}{CHORD_TYPE_DISPLAY.get(chord_type, '')}"
+                for inversion in range(len(offsets)):
+                    table[(key, roman, chord_type, inversion)] = (_voice(root_note, offsets, inversion), name)
+    return table
+
+# 和弦查找表，模块导入时构建一次
+VOICING_TABLE = _build_voicing_table()
+
+@lru_cache(maxsize=FALLBACK_CACHE_SIZE)
+def _parse_chord_symbol(roman_numeral: str, chord_type: str) -> Optional[Tuple[str, str]]:
+    """解析查找表之外的和弦符号，返回 (罗马数字, 和弦类型)，无效时返回None"""
     actual_type = chord_type
     cleaned_roman = roman_numeral.upper()
     
     # 修复：使用统一的大小写处理
-    for suffix, ctype in special_types.items():
+    for suffix, ctype in SPECIAL_TYPES.items():
         suffix_upper = suffix.upper()
         if suffix_upper in cleaned_roman:
             actual_type = ctype
@@ -92,26 +81,72 @@ def chord_to_notes(key: str, roman_numeral: str, chord_type: str, inversion: int
             cleaned_roman = match.group(1)
         else:
             logger.error(f"无效的罗马数字: {cleaned_roman} (原始输入: {roman_numeral})")
-            return []  # 返回空列表避免崩溃
+            return None
     
-    root_idx = ROMAN_TO_DEGREE[cleaned_roman]
-    root_note = SCALE_MAP[key][root_idx]
+    return cleaned_roman, actual_type
+
+@lru_cache(maxsize=FALLBACK_CACHE_SIZE)
+def _fallback_voicing(key: str, roman_numeral: str, chord_type: str,
+                      inversion: int) -> Tuple[Tuple[int, ...], str]:
+    """查找表未命中时解析和弦，结果按LRU缓存"""
+    parsed = _parse_chord_symbol(roman_numeral, chord_type)
+    if parsed is None:
+        return (), ""  # 返回空结果避免崩溃
+    
+    cleaned_roman, actual_type = parsed
+    root_note = SCALE_MAP[key][ROMAN_TO_DEGREE[cleaned_roman]]
+    name = f"{get_note_name(root_note)}{CHORD_TYPE_DISPLAY.get(actual_type, '')}"
     
     # 获取和弦音程
     if actual_type not in CHORD_TYPES:
         logger.warning(f"未知和弦类型: {actual_type}, 使用大三和弦代替")
         actual_type = 'maj'
     
-    offsets = CHORD_TYPES[actual_type]
-    
-    notes = [root_note + offset for offset in offsets]
-    return notes[inversion:] + [n + 12 for n in notes[:inversion]]
+    return _voice(root_note, CHORD_TYPES[actual_type], inversion), name
+
+def chord_to_name(key: str, roman_numeral: str, chord_type: str) -> str:
+    """将罗马数字和弦转换为实际和弦名称"""
+    entry = VOICING_TABLE.get((key, roman_numeral, chord_type, 0))
+    if entry is None:
+        entry = _fallback_voicing(key, roman_numeral, chord_type, 0)
+    return entry[1]
+
+def chord_to_notes(key: str, roman_numeral: str, chord_type: str, inversion: int = 0) -> Tuple[int, ...]:
+    """将罗马数字和弦转换为实际音符"""
+    entry = VOICING_TABLE.get((key, roman_numeral, chord_type, inversion))
+    if entry is None:
+        entry = _fallback_voicing(key, roman_numeral, chord_type, inversion)
+    return entry[0]
 
-def _generate_block_chord(track: MidiTrack, notes: List[int], ticks_per_measure: int, 
+def progression_from_romans(romans: List[str], duration: float = 1.0,
+                            rhythm: str = 'straight') -> List[ChordConfig]:
+    """将和弦数据库中的罗马数字序列转换为和弦配置列表"""
+    progression = []
+    
+    for roman in romans:
+        # 检查是否有(min)后缀
+        is_minor = "(min)" in roman.upper()
+        clean_roman = roman.upper().replace("(MIN)", "")
+    
+        # 获取默认和弦类型（如果是I-IV-V用maj，ii-iii-vi用min）
+        default_type = "min" if clean_roman in ["II", "III", "VI"] else "maj"
+        chord_type = "min" if is_minor else default_type
+    
+        progression.append({
+            "roman": clean_roman,
+            "type": chord_type,
+            "inversion": 0,
+            "duration": duration,
+            "rhythm": rhythm  # 添加默认节奏型
+        })
+    
+    return progression
+
+def _generate_block_chord(events: NoteEventBuffer, notes: Tuple[int, ...], ticks_per_measure: int, 
                          duration: float, rhythm: str = 'straight'):
     """生成柱式和弦（带节奏处理）"""
     RhythmHandler.apply_rhythm(
-        track=track,
+        events=events,
         notes=[60 + note for note in notes],
         ticks=ticks_per_measure,
         duration=duration,
@@ -119,11 +154,11 @@ def _generate_block_chord(track: MidiTrack, notes: List[int], ticks_per_measure:
         velocity=100
     )
 
-def _generate_arpeggio(track: MidiTrack, notes: List[int], ticks_per_measure: int,
+def _generate_arpeggio(events: NoteEventBuffer, notes: Tuple[int, ...], ticks_per_measure: int,
                       duration: float, rhythm: str = 'straight'):
     """生成分解和弦（带节奏处理）"""
     RhythmHandler.apply_rhythm(
-        track=track,
+        events=events,
         notes=[60 + note for note in notes],
         ticks=ticks_per_measure,
         duration=duration/len(notes),  # 分解和弦需要调整时长
@@ -131,6 +166,41 @@ def _generate_arpeggio(track: MidiTrack, notes: List[int], ticks_per_measure: in
         velocity=80
     )
 
+def render_chord_events(
+    events: NoteEventBuffer,
+    chord: ChordConfig,
+    key: str = 'C',
+    style: ChordStyle = 'block',
+    rhythm: str = 'straight',
+    ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT
+):
+    """将单个和弦渲染到事件缓冲区末尾"""
+    ticks_per_measure = ticks_per_beat * 4  # 4/4拍
+    chord_notes = chord_to_notes(key, chord['roman'], chord['type'], chord.get('inversion', 0))
+    duration = chord.get('duration', 1.0)  # 默认1小节
+    chord_rhythm = chord.get('rhythm', rhythm)  # 优先使用和弦自身的节奏设置
+    
+    if style == 'block':
+        _generate_block_chord(events, chord_notes, ticks_per_measure, duration, chord_rhythm)
+    elif style == 'arpeggio':
+        _generate_arpeggio(events, chord_notes, ticks_per_measure, duration, chord_rhythm)
+
+def render_progression_events(
+    progression: List[ChordConfig],
+    key: str = 'C',
+    style: ChordStyle = 'block',
+    rhythm: str = 'straight',
+    ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT
+) -> NoteEventBuffer:
+    """将和弦进行渲染为音符事件缓冲区"""
+    events = NoteEventBuffer()
+    
+    # 生成和弦序列
+    for chord in progression:
+        render_chord_events(events, chord, key, style, rhythm, ticks_per_beat)
+    
+    return events
+
 def generate_progression_midi(
     progression: List[ChordConfig],
     key: str = 'C',
@@ -139,27 +209,27 @@ def generate_progression_midi(
     rhythm: str = 'straight'
 ) -> MidiFile:
     """生成MIDI文件（支持节奏参数）"""
-    mid = MidiFile()
+    mid = MidiFile(ticks_per_beat=DEFAULT_TICKS_PER_BEAT)
     track = MidiTrack()
     mid.tracks.append(track)
     
-    ticks_per_beat = mid.ticks_per_beat
-    ticks_per_measure = ticks_per_beat * 4  # 4/4拍
-    
     # 添加速度和节拍设置
     track.append(Message('program_change', program=0, time=0))
     track.append(MetaMessage('set_tempo', tempo=bpm2tempo(bpm)))
     track.append(MetaMessage('time_signature', numerator=4, denominator=4))
     
-    # 生成和弦序列
-    for chord in progression:
-        chord_notes = chord_to_notes(key, chord['roman'], chord['type'], chord.get('inversion', 0))
-        duration = chord.get('duration', 1.0)  # 默认1小节
-        chord_rhythm = chord.get('rhythm', rhythm)  # 优先使用和弦自身的节奏设置
-        
-        if style == 'block':
-            _generate_block_chord(track, chord_notes, ticks_per_measure, duration, chord_rhythm)
-        elif style == 'arpeggio':
-            _generate_arpeggio(track, chord_notes, ticks_per_measure, duration, chord_rhythm)
-    
-    return mid
\ No newline at end of file
+    events = render_progression_events(progression, key, style, rhythm, mid.ticks_per_beat)
+    events.to_track(track)
+    
+    return mid
+
+def generate_progression_bytes(
+    progression: List[ChordConfig],
+    key: str = 'C',
+    bpm: int = 120,
+    style: ChordStyle = 'block',
+    rhythm: str = 'straight'
+) -> bytes:
+    """直接生成标准MIDI文件字节，跳过mido对象构建"""
+    events = render_progression_events(progression, key, style, rhythm, DEFAULT_TICKS_PER_BEAT)
+    return encode_smf(events, bpm, DEFAULT_TICKS_PER_BEAT)
@@ -1,4 +1,7 @@
-from typing import TypedDict, List, Dict, Literal
+from typing import TYPE_CHECKING, TypedDict, List, Dict, Literal
+
+if TYPE_CHECKING:
+    from song_structure.chord_list import ChordList
 
 ChordType = Literal['maj', 'min', '7', 'maj7', 'sus4', 'm7']
 RomanNumeral = Literal['I', 'II', 'III', 'IV', 'V', 'VI', 'VII']
@@ -18,7 +21,7 @@ class ChordConfig(TypedDict):
 class SongSection(TypedDict):
     name: str
     type: SectionType
-    progression: List[ChordConfig]
+    progression: 'ChordList'  # 按列存储，copy()为O(1)的写时复制
     length: int  # 小节数
     bpm: int
 
@@ -0,0 +1,389 @@
+# src/edit_journal.py
+import logging
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from custom_types import ChordConfig
+from project_file import BinaryReader, ProjectFile, ProjectSettings, pack_str, section_meta
+from song_structure.chord_list import ChordList
+from song_structure.section_manager import SectionManager
+
+logger = logging.getLogger(__name__)
+
+# 恢复文件所在目录，可用环境变量覆盖
+RECOVERY_ENV = 'MIDI_CREATER_RECOVERY'
+RECOVERY_DIR = os.path.join(os.path.expanduser('~'), '.midi_creater', 'recovery')
+
+# 日志超过该大小时把当前状态写入快照并清空日志，恢复时最多重放这么多记录
+COMPACT_BYTES = 1024 * 1024
+
+# 记录帧: 内容长度, 内容的CRC32
+_FRAME = struct.Struct('<LL')
+_OP = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<L')
+_SECTION_META = struct.Struct('<HH')
+_CHORD_VALUES = struct.Struct('<bd')
+
+OP_SETTINGS = 1       # 歌曲参数与当前段落
+OP_SECTION = 2        # 新增段落或修改段落属性
+OP_ORDER = 3          # 段落顺序，未列出的段落被删除
+OP_CHORDS = 4         # 修改部分和弦
+OP_PROGRESSION = 5    # 替换整个和弦进行
+OP_BASE = 6           # 日志的第一条记录: 对应快照的文件头
+
+def _pack_chord(out: bytearray, chord: ChordConfig):
+    pack_str(out, chord['roman'])
+    pack_str(out, chord['type'])
+    out += _CHORD_VALUES.pack(chord.get('inversion', 0), chord.get('duration', 1.0))
+    pack_str(out, chord.get('rhythm'))
+
+def _read_chord(reader: BinaryReader) -> ChordConfig:
+    chord = {'roman': reader.str(), 'type': reader.str()}
+    chord['inversion'], chord['duration'] = reader.unpack(_CHORD_VALUES)
+    rhythm = reader.str()
+    if rhythm:
+        chord['rhythm'] = rhythm
+    return chord
+
+def _iter_frames(data: bytes) -> Iterator[bytes]:
+    """按顺序产生完整的记录，遇到写了一半或损坏的记录时停止"""
+    pos = 0
+    while pos + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, pos)
+        payload = data[pos + _FRAME.size:pos + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            logger.warning(f"编辑日志在偏移{pos}处不完整，忽略之后的内容")
+            return
+        yield payload
+        pos += _FRAME.size + length
+
+def _frame(record: bytes) -> bytes:
+    return _FRAME.pack(len(record), zlib.crc32(record)) + bytes(record)
+
+def _base_record(signature: bytes) -> bytes:
+    return _OP.pack(OP_BASE) + _U16.pack(len(signature)) + signature
+
+def _apply_record(payload: bytes, manager: SectionManager, settings: ProjectSettings) -> ProjectSettings:
+    """把一条记录应用到manager，返回更新后的歌曲参数"""
+    reader = BinaryReader(payload)
+    while reader.pos < len(payload):
+        op, = reader.unpack(_OP)
+        if op == OP_SETTINGS:
+            settings = ProjectSettings(reader.str(), *reader.unpack(_U16), reader.str(), reader.str())
+            manager.current_section = reader.str()
+        elif op == OP_SECTION:
+            name, section_type = reader.str(), reader.str()
+            length, bpm = reader.unpack(_SECTION_META)
+            if name in manager.sections:
+                manager.sections[name].update(type=section_type, length=length, bpm=bpm)
+            else:
+                manager.sections[name] = {
+                    'name': name, 'type': section_type, 'progression': ChordList(),
+                    'length': length, 'bpm': bpm
+                }
+        elif op == OP_ORDER:
+            count, = reader.unpack(_U16)
+            names = [reader.str() for _ in range(count)]
+            manager.sections = {name: manager.sections[name] for name in names if name in manager.sections}
+        elif op == OP_CHORDS:
+            progression = manager.sections[reader.str()]['progression']
+            count, = reader.unpack(_U32)
+            for _ in range(count):
+                index, = reader.unpack(_U32)
+                progression[index] = _read_chord(reader)
+        elif op == OP_PROGRESSION:
+            section = manager.sections[reader.str()]
+            count, = reader.unpack(_U32)
+            section['progression'] = ChordList([_read_chord(reader) for _ in range(count)])
+        else:
+            raise ValueError(f"未知的编辑日志记录: {op}")
+    return settings
+
+@dataclass
+class _Compaction:
+    """交给写线程的快照任务：段落为写时复制副本，unchanged中的段落沿用快照中已有的数据"""
+    manager: SectionManager
+    settings: ProjectSettings
+    unchanged: List[str]
+
+class _JournalWriter:
+    """后台写线程：把主线程提交的记录成批写入，每批只fsync一次（组提交）
+
+    队列中的None表示清空日志并重新写入基准记录，_Compaction表示先保存快照再清空日志。
+    写入出错后停止线程并丢弃之后提交的记录。
+    """
+    def __init__(self, path: str, snapshot: ProjectFile):
+        self.path = path
+        self.snapshot = snapshot
+        self.commits = 0
+        self.frames = 0
+        self.failed = False
+        self._pending: List[Union[bytes, _Compaction, None]] = []
+        self._busy = False
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='journal', daemon=True)
+        self._thread.start()
+
+    def append(self, item: Union[bytes, _Compaction, None]):
+        with self._cond:
+            if self.failed:
+                return
+            self._pending.append(item)
+            self._cond.notify_all()
+
+    def _restart(self, f):
+        f.truncate(0)
+        f.write(_frame(_base_record(self.snapshot.signature())))
+
+    def _run(self):
+        try:
+            with open(self.path, 'ab') as f:
+                while True:
+                    with self._cond:
+                        self._busy = False
+                        self._cond.notify_all()
+                        while not self._pending and not self._closed:
+                            self._cond.wait()
+                        batch, self._pending = self._pending, []
+                        self._busy = bool(batch)
+                    if not batch:
+                        return
+                    for item in batch:
+                        if isinstance(item, bytes):
+                            f.write(item)
+                            self.frames += 1
+                        else:
+                            if item is not None:
+                                self.snapshot.save(item.manager, item.settings, unchanged=item.unchanged)
+                            self._restart(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.commits += 1
+        except Exception as e:
+            logger.error(f"写入编辑日志失败，停用编辑日志: {type(e).__name__}: {e}")
+            with self._cond:
+                self.failed = True
+                self._busy = False
+                self._pending.clear()
+                self._cond.notify_all()
+
+    def drain(self):
+        """等待已提交的记录和快照任务全部完成"""
+        with self._cond:
+            while (self._pending or self._busy) and self._thread.is_alive():
+                self._cond.wait(0.1)
+
+    def close(self, timeout: float = 10.0):
+        """写完已提交的记录后停止线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+class EditJournal:
+    """SectionManager的崩溃恢复日志
+
+    主线程每帧调用capture，把与上次相比的变化（只含改动的和弦）编码为一条记录交给
+    后台线程，后台线程成批写入并fsync，不阻塞界面。日志超过compact_bytes时由后台线程
+    把当前状态增量写入快照（项目文件格式）并清空日志，因此恢复时重放的记录量有上限。
+    正常退出时删除快照和日志，启动时仍存在说明上次异常退出。
+    """
+    def __init__(self, directory: Optional[str] = None, compact_bytes: int = COMPACT_BYTES):
+        self.directory = directory or os.environ.get(RECOVERY_ENV) or RECOVERY_DIR
+        self.compact_bytes = compact_bytes
+        self.snapshot_path = os.path.join(self.directory, 'snapshot.mcp')
+        self.journal_path = os.path.join(self.directory, 'journal.log')
+        self._snapshot = ProjectFile(self.snapshot_path)
+        self._writer: Optional[_JournalWriter] = None
+        # 上次记录时各段落的属性与和弦进行（写时复制副本，未解码的段落为None）
+        self._sections: Dict[str, Tuple[Tuple, Optional[ChordList]]] = {}
+        self._order: List[str] = []
+        self._state: Optional[Tuple] = None
+        self._journal_bytes = 0
+        # 上次写入快照时各段落的属性与基线，压缩时据此判断哪些段落不必重写
+        self._compacted: Dict[str, Tuple[Tuple, Optional[ChordList]]] = {}
+
+    @property
+    def active(self) -> bool:
+        return self._writer is not None and not self._writer.failed
+
+    def recover(self, manager: SectionManager) -> Optional[ProjectSettings]:
+        """载入快照并重放日志，返回恢复的歌曲参数；没有需要恢复的会话时返回None
+
+        快照文件之后会被写线程重写，恢复出的段落在这里全部解码，不再引用快照的映射，
+        写线程因此不会接触界面线程中的段落。
+        """
+        if not os.path.exists(self.snapshot_path):
+            return None
+        settings = self._snapshot.load(manager)
+        data = b''
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+        frames = _iter_frames(data)
+        # 快照更新后、日志清空前退出时，日志仍属于旧快照，不能重放
+        if next(frames, None) != _base_record(self._snapshot.signature()):
+            logger.info("编辑日志与快照不对应，只恢复快照")
+        else:
+            count = 0
+            for payload in frames:
+                settings = _apply_record(payload, manager, settings)
+                count += 1
+            logger.info(f"已恢复上次未正常退出的会话，重放{count}条记录")
+        for section in manager.sections.values():
+            section['progression']
+        return settings
+
+    def start(self, manager: SectionManager, settings: ProjectSettings):
+        """以当前状态为新起点：增量写入快照并清空日志
+
+        在载入项目或恢复会话时调用，会等待写线程完成已提交的任务。
+        """
+        try:
+            if self._writer is not None:
+                self._writer.drain()
+            os.makedirs(self.directory, exist_ok=True)
+            self._snapshot.save(manager, settings)
+            if self._writer is None or self._writer.failed:
+                open(self.journal_path, 'wb').close()
+                self._writer = _JournalWriter(self.journal_path, self._snapshot)
+            self._writer.append(None)
+        except OSError as e:
+            logger.error(f"无法写入恢复文件，停用编辑日志: {str(e)}")
+            return
+
+        self._journal_bytes = 0
+        self._sections = {
+            name: (section_meta(section), section['progression'].copy() if 'progression' in section else None)
+            for name, section in manager.sections.items()
+        }
+        self._order = list(manager.sections)
+        self._state = (replace(settings), manager.current_section)
+        self._compacted = dict(self._sections)
+
+    def capture(self, manager: SectionManager, settings: ProjectSettings):
+        """记录上次调用以来的变化，只在主线程中编码并提交，不等待写入"""
+        if not self.active:
+            return
+        record = bytearray()
+        for name, section in manager.sections.items():
+            meta = section_meta(section)
+            old_meta, baseline = self._sections.get(name, (None, None))
+            # 段落属性记录在前，重放时新增的段落先被创建
+            if meta != old_meta:
+                record += _OP.pack(OP_SECTION)
+                pack_str(record, name)
+                pack_str(record, section['type'])
+                record += _SECTION_META.pack(section['length'], section['bpm'])
+            if old_meta is None:
+                progression = section['progression']
+                self._pack_progression(record, name, progression)
+            else:
+                progression = section['progression'] if 'progression' in section else None
+                if progression is not None and baseline is None:
+                    # 上次记录后才解码的段落，与解码出的原始内容比较
+                    baseline = getattr(section, 'decoded_progression', None)
+                if progression is not None and baseline is not None:
+                    changed = progression.diff(baseline)
+                    if changed is None:
+                        self._pack_progression(record, name, progression)
+                    elif changed:
+                        record += _OP.pack(OP_CHORDS)
+                        pack_str(record, name)
+                        record += _U32.pack(len(changed))
+                        for index in changed:
+                            record += _U32.pack(index)
+                            _pack_chord(record, progression[index])
+                    else:
+                        progression = baseline
+            if progression is not None and progression is not baseline:
+                progression = progression.copy()
+            self._sections[name] = (meta, progression)
+
+        order = list(manager.sections)
+        if order != self._order:
+            record += _OP.pack(OP_ORDER)
+            record += _U16.pack(len(order))
+            for name in order:
+                pack_str(record, name)
+            for name in set(self._order) - set(order):
+                self._sections.pop(name, None)
+            self._order = order
+
+        state = (settings, manager.current_section)
+        if state != self._state:
+            record += _OP.pack(OP_SETTINGS)
+            pack_str(record, settings.key)
+            record += _U16.pack(settings.bpm)
+            pack_str(record, settings.style)
+            pack_str(record, settings.rhythm)
+            pack_str(record, manager.current_section)
+            self._state = (replace(settings), manager.current_section)
+
+        if not record:
+            return
+        frame = _frame(record)
+        self._writer.append(frame)
+        self._journal_bytes += len(frame)
+        if self._journal_bytes > self.compact_bytes:
+            self._compact(manager, settings)
+
+    def _compact(self, manager: SectionManager, settings: ProjectSettings):
+        """把刚记录的状态交给写线程保存为快照，主线程只复制段落属性和写时复制的基线
+
+        交给写线程的是新建的段落字典和日志自己持有的基线，界面线程之后修改段落不会影响它们；
+        尚未解码的段落列入unchanged，由写线程直接沿用快照中已有的数据。
+        """
+        sections = {}
+        unchanged = []
+        for name in self._order:
+            meta, progression = self._sections[name]
+            # 基线只在内容变化时才被替换，对象相同说明上次写入快照后没有修改
+            last = self._compacted.get(name)
+            if last is not None and last[0] == meta and last[1] is progression:
+                unchanged.append(name)
+            elif progression is None:
+                # 快照中没有该段落的数据（不应出现），只能在这里解码
+                progression = manager.sections[name]['progression'].copy()
+                self._sections[name] = (meta, progression)
+            section = dict(zip(('name', 'type', 'length', 'bpm'), (name, *meta)))
+            if progression is not None:
+                section['progression'] = progression
+            sections[name] = section
+        self._compacted = dict(self._sections)
+        snapshot = SectionManager(sections, manager.current_section)
+        self._writer.append(_Compaction(snapshot, replace(settings), unchanged))
+        self._journal_bytes = 0
+
+    def _pack_progression(self, record: bytearray, name: str, progression: ChordList):
+        record += _OP.pack(OP_PROGRESSION)
+        pack_str(record, name)
+        record += _U32.pack(len(progression))
+        for chord in progression:
+            _pack_chord(record, chord)
+
+    def stats(self) -> Dict[str, int]:
+        """已写入的记录数、fsync次数以及自上次快照以来的日志大小"""
+        if self._writer is None:
+            return {'frames': 0, 'commits': 0, 'journal_bytes': 0}
+        return {
+            'frames': self._writer.frames,
+            'commits': self._writer.commits,
+            'journal_bytes': self._journal_bytes
+        }
+
+    def close(self, clean: bool = True):
+        """停止写线程；正常退出时删除恢复文件"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._snapshot.close()
+        if clean:
+            for path in (self.journal_path, self.snapshot_path):
+                if os.path.exists(path):
+                    os.remove(path)
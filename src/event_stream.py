@@ -0,0 +1,49 @@
+# src/event_stream.py
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+from chord_generator import DEFAULT_TICKS_PER_BEAT, render_chord_events
+from custom_types import ChordConfig, ChordStyle
+from note_events import NoteEventBuffer
+from song_structure.section_manager import SectionManager
+
+class TimedEvent(NamedTuple):
+    tick: int          # 从歌曲开头算起的绝对tick
+    status: int        # 状态字节(含通道)
+    note: int
+    velocity: int
+
+def iter_chord_blocks(progression: Iterable[ChordConfig], key: str = 'C', style: ChordStyle = 'block',
+                      rhythm: str = 'straight',
+                      ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT) -> Iterator[NoteEventBuffer]:
+    """逐个和弦渲染，每次产生一个从0开始的事件块"""
+    for chord in progression:
+        block = NoteEventBuffer()
+        render_chord_events(block, chord, key, style, rhythm, ticks_per_beat)
+        yield block
+
+def iter_progression_events(progression: Iterable[ChordConfig], key: str = 'C', style: ChordStyle = 'block',
+                            rhythm: str = 'straight', ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT,
+                            start_tick: int = 0) -> Iterator[TimedEvent]:
+    """按和弦惰性产生带绝对时间的音符事件，内存中只保留当前和弦
+
+    产生的事件顺序与render_progression_events的缓冲区一致。
+    """
+    return iter_block_events(iter_chord_blocks(progression, key, style, rhythm, ticks_per_beat), start_tick)
+
+def iter_block_events(blocks: Iterable[NoteEventBuffer], start_tick: int = 0) -> Iterator[TimedEvent]:
+    """依次接上从0开始的事件块，产生带绝对时间的事件，块本身不被修改"""
+    tick = start_tick
+    for block in blocks:
+        for event_tick, status, note, velocity in zip(block.ticks, block.status, block.notes, block.velocities):
+            yield TimedEvent(tick + event_tick, status, note, velocity)
+        tick += block.end_tick
+
+def iter_song_events(manager: SectionManager, key: str = 'C', style: ChordStyle = 'block',
+                     rhythm: str = 'straight', ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT,
+                     section_names: Optional[List[str]] = None) -> Iterator[TimedEvent]:
+    """按段落顺序产生整首歌曲的事件，与SongRenderer.render_song的结果一致
+
+    section_names指定播放顺序，默认按段落添加的顺序。
+    """
+    names = list(manager.sections) if section_names is None else section_names
+    chords = (chord for name in names for chord in manager.sections[name]['progression'])
+    return iter_progression_events(chords, key, style, rhythm, ticks_per_beat)
@@ -1,14 +1,16 @@
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
 import pygame
 import logging
 from constants import CHORD_TYPES, CHORD_TYPE_DISPLAY
 from custom_types import ChordConfig
 from utils.font_manager import FontManager
+from utils.dirty_rect import DirtyTracker
+from utils.text_cache import TextCache
 from chord_generator import chord_to_name
 
 logger = logging.getLogger(__name__)
 
-class ChordGridEditor:
+class ChordGridEditor(DirtyTracker):
     ROMAN_NUMERALS = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII']
     CHORD_TYPES = list(CHORD_TYPES.keys())
     INVERSIONS = [0, 1, 2]
@@ -67,6 +69,21 @@ class ChordGridEditor:
         }
         
         self.font_manager = FontManager()
+        self.text_cache = TextCache()
+        
+        # 和弦被修改时的回调 (index, chord)
+        self.on_chord_change: Optional[Callable[[int, ChordConfig], None]] = None
+
+    @property
+    def tracks_hover(self) -> bool:
+        # Only the option panel highlights the hovered item
+        return self.show_options
+
+    def get_bounds(self) -> pygame.Rect:
+        """Grid area plus the option panel when it is open"""
+        if self.show_options and self.option_panel_rect:
+            return self.rect.union(self.option_panel_rect)
+        return self.rect
 
     def _update_scroll_thumb(self):
         """Update scroll thumb position and size"""
@@ -117,6 +134,7 @@ class ChordGridEditor:
         else:
             self.selected_chord_idx = max(0, min(self.selected_chord_idx, len(self.progression) - 1))
         self._update_scroll_thumb()
+        self.invalidate()
 
     def handle_event(self, event: pygame.event.Event) -> bool:
         """Handle input events"""
@@ -163,13 +181,11 @@ class ChordGridEditor:
                         handled = True
                         break
                 
-            for i, chord in enumerate(self.progression):
-                cell_rect = self._get_cell_rect(i)
-                if cell_rect.collidepoint(mouse_pos):
-                    self.selected_chord_idx = i
-                    handled = True
-                    self._show_chord_options(i, mouse_pos)
-                    break
+            i = self._cell_index_at(mouse_pos)
+            if i is not None:
+                self.selected_chord_idx = i
+                handled = True
+                self._show_chord_options(i, mouse_pos)
                     
             self.show_options = False
             
@@ -249,6 +265,24 @@ class ChordGridEditor:
             self.rect.height - 2 * self.cell_padding - self.scroll_bar_height
         )
 
+    def _visible_range(self) -> range:
+        """Indices of cells that can intersect the grid at the current scroll offset"""
+        if not self.progression:
+            return range(0)
+        # One extra cell on each side absorbs rounding; _get_cell_rect does the exact test
+        first = int((self.scroll_offset - self.cell_padding) // self.cell_width) - 1
+        last = int((self.scroll_offset - self.cell_padding + self.rect.width) // self.cell_width) + 1
+        return range(max(0, first), min(len(self.progression), last + 1))
+
+    def _cell_index_at(self, pos: Tuple[int, int]) -> Optional[int]:
+        """Index of the chord cell under pos, or None"""
+        column = int((pos[0] - self.rect.x - self.cell_padding + self.scroll_offset) // self.cell_width)
+        # Cell rects are truncated to whole pixels, so the neighbour may own the column edge
+        for i in (column, column + 1):
+            if 0 <= i < len(self.progression) and self._get_cell_rect(i).collidepoint(pos):
+                return i
+        return None
+
     def _show_chord_options(self, chord_idx: int, pos: Tuple[int, int], option_type: str = None):
         """Show options for chord at given index"""
         if not 0 <= chord_idx < len(self.progression):
@@ -317,6 +351,10 @@ class ChordGridEditor:
             chord['type'] = value
         elif key == 'inversion':
             chord['inversion'] = int(value)
+        
+        self.invalidate()
+        if self.on_chord_change:
+            self.on_chord_change(self.selected_chord_idx, chord)
 
     def draw(self, surface: pygame.Surface):
         """Draw the grid editor"""
@@ -330,8 +368,9 @@ class ChordGridEditor:
         
         pygame.draw.rect(surface, self.colors['background'], self.rect, border_radius=8)
         
-        # Draw chord cells
-        for i, chord in enumerate(self.progression):
+        # Draw chord cells (only the visible ones)
+        for i in self._visible_range():
+            chord = self.progression[i]
             cell_rect = self._get_cell_rect(i)
             if cell_rect.width == 0:
                 continue
@@ -351,13 +390,13 @@ class ChordGridEditor:
             
             # Draw chord name (centered)
             font = self.font_manager.get_font(20)
-            text_surf = font.render(chord_name, True, self.colors['text'])
+            text_surf = self.text_cache.render(font, chord_name, self.colors['text'])
             text_rect = text_surf.get_rect(center=(cell_rect.centerx, cell_rect.centery - 20))
             surface.blit(text_surf, text_rect)
             
             # Draw duration (centered)
             font = self.font_manager.get_font(16)
-            dur_surf = font.render(duration_text, True, self.colors['text'])
+            dur_surf = self.text_cache.render(font, duration_text, self.colors['text'])
             dur_rect = dur_surf.get_rect(center=(cell_rect.centerx, cell_rect.centery + 25))
             surface.blit(dur_surf, dur_rect)
             
@@ -372,7 +411,7 @@ class ChordGridEditor:
                 )
                 pygame.draw.rect(surface, self.colors['highlight'], btn_rect, border_radius=4)
                 font = self.font_manager.get_font(14)
-                text_surf = font.render("...", True, self.colors['text'])
+                text_surf = self.text_cache.render(font, "...", self.colors['text'])
                 text_rect = text_surf.get_rect(center=btn_rect.center)
                 surface.blit(text_surf, text_rect)
                 
@@ -428,7 +467,7 @@ class ChordGridEditor:
                 title_text = "选择转位"
             
             if title_text:
-                title_surf = font.render(title_text, True, self.colors['text'])
+                title_surf = self.text_cache.render(font, title_text, self.colors['text'])
                 surface.blit(title_surf, (self.option_panel_rect.x + 10, self.option_panel_rect.y + 5 - self.option_scroll_offset))
         
         # 绘制选项
@@ -462,7 +501,7 @@ class ChordGridEditor:
             elif key == 'inversion':
                 text = f"转位: {value}"
             
-            text_surf = font.render(text, True, self.colors['text'])
+            text_surf = self.text_cache.render(font, text, self.colors['text'])
             text_rect = text_surf.get_rect(midleft=(adjusted_rect.x + 10, adjusted_rect.centery))
             surface.blit(text_surf, text_rect)
         
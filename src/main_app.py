@@ -1,19 +1,32 @@
 # src/main_app.py
 import pygame
 import os
+import io
 import logging
-import tempfile
-from typing import Dict, List
-from chord_generator import CHORD_DB, generate_progression_midi, chord_to_notes
+from typing import Dict, List, Optional
+from chord_generator import CHORD_DB, chord_to_notes, progression_from_romans
+from render_cache import RenderCache
+from render_worker import JobResult, RenderWorker
+from sequencer import Sequencer, sequencer_from_env
+from note_events import NoteEventBuffer
+from edit_journal import EditJournal
+from project_file import ProjectFile, ProjectSettings
 from visualizer import PianoRoll, ChordPreview
 from grid_editor import ChordGridEditor
 from skin_manager import SkinManager
 from utils.debug_tools import DebugTools
+from utils.dirty_rect import DirtyTracker
+from utils.font_manager import FontManager
+from utils.frame_profiler import FrameProfiler, ProfilerOverlay
+from utils.text_cache import TextCache
 from custom_types import ChordConfig, SongSection, SectionType
 from style_selector import StyleSelector
+from song_structure.chord_list import ChordList
 from song_structure.section_manager import SectionManager
 from song_structure.clipboard import ChordClipboard
+from song_structure.history import EditHistory
 from song_structure.structure_editor import StructureEditor
+from song_structure.song_renderer import SongRenderer
 from rhythm.editor import RhythmEditor
 from rhythm.handler import RhythmHandler
 from rhythm.types import RHYTHM_TYPES
@@ -29,21 +42,71 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 播放或拖动时的帧率
+ACTIVE_FPS = 60
+# 空闲时等待事件的超时时间(毫秒)
+IDLE_WAIT_MS = 1000
+# 自动保存间隔(毫秒)，只在已保存或打开过项目文件后进行
+AUTOSAVE_INTERVAL_MS = 60000
+PROJECT_EXTENSION = '.mcp'
+# 后台任务完成事件，event.result为JobResult
+WORKER_DONE = pygame.event.custom_type()
+
+def coalesce_mouse_motion(events: List[pygame.event.Event]) -> List[pygame.event.Event]:
+    """合并连续的鼠标移动事件，保留最后的位置并累加位移"""
+    result = []
+    for event in events:
+        if event.type == pygame.MOUSEMOTION and result and result[-1].type == pygame.MOUSEMOTION:
+            prev = result[-1]
+            rel = (prev.rel[0] + event.rel[0], prev.rel[1] + event.rel[1])
+            result[-1] = pygame.event.Event(pygame.MOUSEMOTION, {**event.dict, 'rel': rel})
+        else:
+            result.append(event)
+    return result
+
 class MidiPlayer:
-    def __init__(self):
+    def __init__(self, sequencer: Optional[Sequencer] = None):
         self.is_playing = False
-        self.current_midi_file = None
+        self.current_midi = None  # 文件路径、内存缓冲区或事件序列
+        # 设置了实时输出端口时由音序器直接发送事件，否则通过mixer播放MIDI文件
+        self.sequencer = sequencer
         pygame.mixer.init()
     
     def set_midi_file(self, midi_path):
-        self.current_midi_file = midi_path
+        self.current_midi = midi_path
         try:
             pygame.mixer.music.load(midi_path)
         except pygame.error as e:
             logger.error(f"加载MIDI文件失败: {str(e)}")
+            self.current_midi = None
+    
+    def set_midi_data(self, midi_bytes: bytes):
+        """从内存加载MIDI数据，不经过临时文件"""
+        # 播放期间SDL会持续读取缓冲区，需保留引用
+        self.current_midi = io.BytesIO(midi_bytes)
+        try:
+            pygame.mixer.music.load(self.current_midi, 'mid')
+        except pygame.error as e:
+            logger.error(f"加载MIDI数据失败: {str(e)}")
+            self.current_midi = None
+    
+    def set_midi_events(self, events: NoteEventBuffer, bpm: int):
+        """把事件交给实时音序器"""
+        self.sequencer.load(events, bpm)
+        self.current_midi = events
+    
+    def set_bpm(self, bpm: int):
+        """播放中改变速度（仅实时音序器支持）"""
+        if self.sequencer:
+            self.sequencer.set_bpm(bpm)
     
     def play(self):
-        if self.current_midi_file:
+        if self.sequencer:
+            if self.current_midi is not None:
+                self.sequencer.play(0)
+                self.is_playing = True
+            return
+        if self.current_midi:
             try:
                 pygame.mixer.music.play()
                 self.is_playing = True
@@ -52,27 +115,33 @@ class MidiPlayer:
                 self.is_playing = False
     
     def stop(self):
-        pygame.mixer.music.stop()
+        if self.sequencer:
+            self.sequencer.stop()
+        else:
+            pygame.mixer.music.stop()
         self.is_playing = False
     
-    def save_midi(self, midi):
-        """保存MIDI到临时文件并返回路径"""
-        try:
-            temp_path = tempfile.mktemp(suffix='.mid')
-            midi.save(temp_path)
-            return temp_path
-        except Exception as e:
-            logger.error(f"保存MIDI文件失败: {str(e)}")
-            return None
+    def update(self):
+        """检测播放是否已自然结束"""
+        if self.sequencer:
+            self.is_playing = self.sequencer.is_playing
+        elif self.is_playing and not pygame.mixer.music.get_busy():
+            self.is_playing = False
+    
+    def close(self):
+        if self.sequencer:
+            self.sequencer.close()
     
     def handle_event(self, event):
         """处理MIDI播放相关事件"""
-        if event.type == pygame.USEREVENT and event.code == 'MIDI_END':
+        if event.type == pygame.USEREVENT and getattr(event, 'code', None) == 'MIDI_END':
             self.is_playing = False
             return True
         return False
 
-class Button:
+class Button(DirtyTracker):
+    tracks_hover = True
+    
     def __init__(self, rect: pygame.Rect, text: str, color: tuple, hover_color: tuple, font_size=20):
         self.rect = rect
         self.text = text
@@ -80,40 +149,23 @@ class Button:
         self.hover_color = hover_color
         self.is_hovered = False
         self.border_radius = 6
-        self.font = self._get_chinese_font(font_size)
-    
-    def _get_chinese_font(self, size):
-        """获取支持中文的字体"""
-        font_names = [
-            'Microsoft YaHei',  # Windows
-            'SimHei',           # Windows
-            'PingFang SC',      # macOS
-            'STHeiti',          # macOS
-            'WenQuanYi Zen Hei',# Linux
-            'Noto Sans CJK SC'  # Linux
-        ]
-        
-        for name in font_names:
-            try:
-                font = pygame.font.SysFont(name, size)
-                test_surface = font.render("测试", True, (255, 255, 255))
-                if test_surface.get_width() > 0:
-                    return font
-            except:
-                continue
-        return pygame.font.SysFont(None, size)
+        self.font = FontManager().get_font(font_size)
+        self.text_cache = TextCache()
     
     def draw(self, surface: pygame.Surface):
         color = self.hover_color if self.is_hovered else self.color
         pygame.draw.rect(surface, color, self.rect, border_radius=self.border_radius)
         pygame.draw.rect(surface, (30, 30, 30), self.rect, 2, border_radius=self.border_radius)
         
-        text_surf = self.font.render(self.text, True, (255, 255, 255))
+        text_surf = self.text_cache.render(self.font, self.text, (255, 255, 255))
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
     
     def check_hover(self, pos):
-        self.is_hovered = self.rect.collidepoint(pos)
+        is_hovered = bool(self.rect.collidepoint(pos))
+        if is_hovered != self.is_hovered:
+            self.is_hovered = is_hovered
+            self.invalidate()
         return self.is_hovered
     
     def handle_event(self, event):
@@ -121,7 +173,9 @@ class Button:
             return True
         return False
 
-class RhythmSelector:
+class RhythmSelector(DirtyTracker):
+    tracks_hover = True
+    
     def __init__(self, rect: pygame.Rect, default_rhythm: str = 'straight'):
         self.rect = rect
         self.selected_rhythm = default_rhythm
@@ -129,6 +183,11 @@ class RhythmSelector:
         self.options = RHYTHM_TYPES
         self.option_rects = []
         
+        # 字体只创建一次，文字表面由共享缓存复用
+        self.font = FontManager().get_font(18)
+        self.option_font = FontManager().get_font(16)
+        self.text_cache = TextCache()
+        
         # UI styling
         self.colors = {
             'background': (60, 60, 80),
@@ -156,6 +215,12 @@ class RhythmSelector:
         self.scroll_dragging = False
         self._update_scroll_thumb()
 
+    def get_bounds(self) -> pygame.Rect:
+        """按钮区域，展开时包含选项面板"""
+        if self.expanded:
+            return self.rect.union(self.panel_rect)
+        return self.rect
+
     def _update_scroll_thumb(self):
         """更新滚动条滑块位置和大小"""
         total_height = len(self.options) * 30 + 10
@@ -247,8 +312,7 @@ class RhythmSelector:
         pygame.draw.rect(surface, self.colors['border'], self.rect, 2, border_radius=6)
         
         # Draw button text
-        font = pygame.font.SysFont('Arial', 18)
-        text = font.render(self.selected_rhythm, True, self.colors['text'])
+        text = self.text_cache.render(self.font, self.selected_rhythm, self.colors['text'])
         text_rect = text.get_rect(center=self.rect.center)
         surface.blit(text, text_rect)
         
@@ -275,7 +339,6 @@ class RhythmSelector:
         surface.set_clip(self.panel_rect)
         
         mouse_pos = pygame.mouse.get_pos()
-        font = pygame.font.SysFont('Arial', 16)
         self.option_rects = []
         
         for i, option in enumerate(self.options):
@@ -297,7 +360,7 @@ class RhythmSelector:
             pygame.draw.rect(surface, self.colors['border'], option_rect, 1, border_radius=4)
             
             # Draw option text
-            text = font.render(option, True, self.colors['text'])
+            text = self.text_cache.render(self.option_font, option, self.colors['text'])
             text_rect = text.get_rect(midleft=(option_rect.x + 10, option_rect.centery))
             surface.blit(text, text_rect)
         
@@ -324,7 +387,13 @@ class ChordGeneratorApp:
     def __init__(self):
         logger.info("=== 应用程序初始化开始 ===")
         
-        self.midi_player = MidiPlayer()
+        self.midi_player = MidiPlayer(sequencer_from_env())
+        self.text_cache = TextCache()
+        self.profiler = FrameProfiler()
+        # 渲染器和缓存只在后台线程中访问
+        self.render_cache = RenderCache()
+        self.song_renderer = SongRenderer()
+        self.worker = RenderWorker(self._post_job_result)
         
         pygame.init()
         os.environ['SDL_VIDEO_CENTERED'] = '1'
@@ -342,10 +411,16 @@ class ChordGeneratorApp:
         self.is_maximized = False
         self.rhythm_type = "straight"
         
+        # 脏区域重绘状态，首帧需要完整绘制
+        self._full_redraw = True
+        
         # 新增段落管理相关初始化
         self.section_manager = SectionManager()
         self.clipboard = ChordClipboard()
         self._init_default_sections()
+        self.history = EditHistory(self.section_manager)
+        self.project_file: Optional[ProjectFile] = None
+        self._last_autosave = 0
         
         # 初始化UI区域和组件
         self._init_ui_layout()
@@ -353,9 +428,12 @@ class ChordGeneratorApp:
         self._init_fonts()
         self._init_ui_elements()
         
-        self.progression: List[ChordConfig] = []
+        self.progression = ChordList()
         self.selected_chord_idx = 0
         self.load_current_progression()
+        self.history.reset()
+        self.journal = EditJournal()
+        self._recover_session()
         logger.info("=== 应用程序初始化完成 ===")
     
     def _init_default_sections(self):
@@ -396,6 +474,7 @@ class ChordGeneratorApp:
         self.style_selector = StyleSelector(self.ui_areas['style_selector'])
         self.structure_editor = StructureEditor(self.ui_areas['structure_editor'], self.section_manager)
         self.rhythm_editor = RhythmEditor(self.ui_areas['rhythm_editor'])
+        self.grid_editor.on_chord_change = self._on_chord_change
         
         # 确保组件有正确的和弦数据
         if hasattr(self, 'progression'):
@@ -403,29 +482,64 @@ class ChordGeneratorApp:
         if hasattr(self, 'selected_chord_idx'):
             self.update_chord_display()
     
+    def _on_chord_change(self, index: int, chord: ChordConfig):
+        """网格编辑器修改和弦后记入历史，并只重新渲染该和弦"""
+        self.history.commit('修改和弦')
+        self.worker.submit('edit', self.song_renderer.update_chord,
+                           self.section_manager.current_section, index, dict(chord), supersede=False)
+    
+    def _post_job_result(self, result: JobResult):
+        """后台线程回调：把任务结果投递到主线程的事件队列"""
+        pygame.event.post(pygame.event.Event(WORKER_DONE, result=result))
+    
+    def _render_song(self, song: SectionManager, key: str, bpm: int, style: str, rhythm: str) -> bytes:
+        """在后台线程中把整首歌曲渲染为MIDI字节，只重新渲染有变化的和弦"""
+        self.song_renderer.configure(key, style, rhythm)
+        return self.render_cache.render(
+            progression=[section['progression'] for section in song.sections.values()],
+            key=key,
+            bpm=bpm,
+            style=style,
+            rhythm=rhythm,
+            generate=lambda: self.song_renderer.render_song_bytes(song, bpm)
+        )
+    
+    def _render_song_events(self, song: SectionManager, key: str, bpm: int, style: str,
+                            rhythm: str) -> NoteEventBuffer:
+        """在后台线程中渲染整首歌曲的事件，供实时音序器使用（速度在播放时换算，无需参与渲染）"""
+        self.song_renderer.configure(key, style, rhythm)
+        return self.song_renderer.render_song(song).copy()
+    
+    def _write_midi_file(self, file_path: str, song: SectionManager, key: str,
+                         bpm: int, style: str, rhythm: str) -> str:
+        """在后台线程中渲染整首歌曲并写入MIDI文件"""
+        midi_bytes = self._render_song(song, key, bpm, style, rhythm)
+        with open(file_path, 'wb') as f:
+            f.write(midi_bytes)
+        return file_path
+    
+    def _handle_job_result(self, result: JobResult):
+        """处理后台任务完成事件"""
+        if result.error:
+            logger.error(f"后台任务失败 ({result.kind}): {result.error}")
+            return
+        
+        if result.kind == 'play':
+            if isinstance(result.value, NoteEventBuffer):
+                self.midi_player.set_midi_events(result.value, self.bpm)
+            else:
+                self.midi_player.set_midi_data(result.value)
+            self.midi_player.play()
+        elif result.kind == 'export':
+            logger.info(f"MIDI文件已保存到: {result.value}")
+    
     def _init_fonts(self):
         """初始化所有字体"""
-        self.title_font = self._get_chinese_font(24, bold=True)
-        self.ui_font = self._get_chinese_font(20)
-        self.small_font = self._get_chinese_font(16)
-    
-    def _get_chinese_font(self, size, bold=False):
-        """获取支持中文的字体"""
-        font_names = [
-            'Microsoft YaHei', 'SimHei', 
-            'PingFang SC', 'STHeiti',
-            'WenQuanYi Zen Hei', 'Noto Sans CJK SC'
-        ]
-        
-        for name in font_names:
-            try:
-                font = pygame.font.SysFont(name, size, bold=bold)
-                test_surface = font.render("测试", True, (255, 255, 255))
-                if test_surface.get_width() > 0:
-                    return font
-            except:
-                continue
-        return pygame.font.SysFont(None, size, bold=bold)
+        font_manager = FontManager()
+        self.title_font = font_manager.get_font(24, bold=True)
+        self.ui_font = font_manager.get_font(20)
+        self.small_font = font_manager.get_font(16)
+        self.profiler_overlay = ProfilerOverlay((10, 10), self.small_font, self.profiler)
     
     def _init_ui_elements(self):
         """初始化所有UI元素"""
@@ -530,6 +644,7 @@ class ChordGeneratorApp:
         
         # 更新UI布局
         self._update_ui_layout()
+        self._full_redraw = True
         self.buttons['maximize'].text = "最大化" if not self.is_maximized else "恢复窗口"
     
     def _update_ui_layout(self):
@@ -541,27 +656,12 @@ class ChordGeneratorApp:
     def load_current_progression(self):
         """加载当前和弦进行"""
         progression_data = CHORD_DB[self.current_style][self.current_progression]
-        self.progression = []
-    
-        for roman in progression_data:
-            # 检查是否有(min)后缀
-            is_minor = "(min)" in roman.upper()
-            clean_roman = roman.upper().replace("(MIN)", "")
-        
-            # 获取默认和弦类型（如果是I-IV-V用maj，ii-iii-vi用min）
-            default_type = "min" if clean_roman in ["II", "III", "VI"] else "maj"
-            chord_type = "min" if is_minor else default_type
-        
-            self.progression.append({
-                "roman": clean_roman,
-                "type": chord_type,
-                "inversion": 0,
-                "duration": self.default_duration,
-                "rhythm": self.rhythm_type  # 添加默认节奏型
-            })
-    
-        # 更新当前段落的和弦进行
-        self.section_manager.set_current_progression(self.progression)
+        # 更新当前段落的和弦进行，界面与段落管理器共用同一个ChordList
+        self.section_manager.set_current_progression(progression_from_romans(
+            progression_data, self.default_duration, self.rhythm_type
+        ))
+        self.progression = self.section_manager.get_current_progression()
+        self.history.commit('载入和弦进行')
         if hasattr(self, 'grid_editor'):  # 确保grid_editor已初始化
             self.grid_editor.set_progression(self.progression)
         self.update_chord_display()
@@ -584,41 +684,76 @@ class ChordGeneratorApp:
             chord_str += f"/{chord_data['inversion']}"
         
         self.chord_display.update(chord_str, [60 + note for note in notes])
-        self.piano_visualizer.chord_notes = [60 + note for note in notes]
+        self.piano_visualizer.update([60 + note for note in notes])
 
-    def handle_events(self) -> bool:
-        """处理输入事件"""
+    def handle_events(self, events: Optional[List[pygame.event.Event]] = None) -> bool:
+        """处理本轮所有输入事件，返回False表示退出"""
+        if events is None:
+            events = pygame.event.get()
+        
         mouse_pos = pygame.mouse.get_pos()
     
         for button in self.buttons.values():
             button.check_hover(mouse_pos)
     
-        for event in pygame.event.get():
+        for event in coalesce_mouse_motion(events):
             if event.type == pygame.QUIT:
                 return False
             
+            self._invalidate_for_event(event)
+            
+            # F3切换帧分析浮层，F4导出帧跟踪
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.toggle()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and self.profiler.enabled:
+                self.profiler.dump_trace()
+                continue
+            
+            # Ctrl+Z撤销，Ctrl+Y或Ctrl+Shift+Z重做；Ctrl+S保存(加Shift另存为)，Ctrl+O打开项目
+            if event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL:
+                shift = bool(event.mod & pygame.KMOD_SHIFT)
+                if event.key in (pygame.K_z, pygame.K_y):
+                    self._step_history(redo=event.key == pygame.K_y or shift)
+                    continue
+                if event.key == pygame.K_s:
+                    self.save_project(save_as=shift)
+                    continue
+                if event.key == pygame.K_o:
+                    self.open_project()
+                    continue
+            
+            # 处理MIDI播放事件
+            if self.midi_player.handle_event(event):
+                continue
+            
+            if event.type == WORKER_DONE:
+                self._handle_job_result(event.result)
+                continue
+            
             if event.type == pygame.VIDEORESIZE and not self.is_maximized:
                 self.screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
                 self._update_ui_layout()
-                return True
+                continue
             
             if self.style_selector.handle_event(event):
                 self.current_style = self.style_selector.selected_style
                 self.current_progression = self.style_selector.selected_progression
                 self.load_current_progression()
-                return True
+                continue
             
             # 处理段落编辑器事件
             if self.structure_editor.handle_event(event):
-                # 段落切换后更新当前和弦进行
+                # 段落切换或粘贴后更新当前和弦进行
+                self.history.commit('段落编辑')
                 self.progression = self.section_manager.get_current_progression()
                 self.grid_editor.set_progression(self.progression)
                 self.update_chord_display()
-                return True
+                continue
             
             # 处理节奏编辑器事件
             if self.rhythm_editor.handle_event(event):
-                return True
+                continue
             
             # 处理节奏选择器事件
             if self.rhythm_selector.handle_event(event):
@@ -626,51 +761,46 @@ class ChordGeneratorApp:
                 # 更新当前和弦的节奏型
                 for chord in self.progression:
                     chord['rhythm'] = self.rhythm_type
-                return True
+                self.history.commit('修改节奏')
+                continue
             
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if self.buttons['export'].handle_event(event):
                     self.export_midi()
-                    return True
+                    continue
                 elif self.buttons['bpm_up'].handle_event(event):
                     self.bpm = min(240, self.bpm + 5)
-                    return True
+                    self.midi_player.set_bpm(self.bpm)
+                    continue
                 elif self.buttons['bpm_down'].handle_event(event):
                     self.bpm = max(40, self.bpm - 5)
-                    return True
+                    self.midi_player.set_bpm(self.bpm)
+                    continue
                 elif self.buttons['duration_up'].handle_event(event):
                     self.default_duration = min(4.0, self.default_duration + 0.25)
-                    return True
+                    continue
                 elif self.buttons['duration_down'].handle_event(event):
                     self.default_duration = max(0.25, self.default_duration - 0.25)
-                    return True
+                    continue
                 elif self.buttons['style_toggle'].handle_event(event):
                     self.chord_style = 'block' if self.chord_style == 'arpeggio' else 'arpeggio'
                     self.buttons['style_toggle'].text = "切换为分解和弦" if self.chord_style == "block" else "切换为柱式和弦"
-                    return True
+                    continue
                 elif self.buttons['play'].handle_event(event):
-                    # 生成并播放MIDI (使用当前段落的和弦进行)
-                    try:
-                        midi = generate_progression_midi(
-                            progression=self.section_manager.get_current_progression(),
-                            key=self.key,
-                            bpm=self.bpm,
-                            style=self.chord_style,
-                            rhythm=self.rhythm_type
-                        )
-                        midi_path = self.midi_player.save_midi(midi)
-                        if midi_path:
-                            self.midi_player.set_midi_file(midi_path)
-                            self.midi_player.play()
-                    except Exception as e:
-                        logger.error(f"播放失败: {str(e)}")
-                    return True
+                    # 在后台生成整首歌曲的MIDI (使用各段落的快照)，完成后播放；连续点击只保留最后一次
+                    render = self._render_song_events if self.midi_player.sequencer else self._render_song
+                    self.worker.submit(
+                        'play', render, self.section_manager.snapshot(),
+                        self.key, self.bpm, self.chord_style, self.rhythm_type
+                    )
+                    continue
                 elif self.buttons['stop'].handle_event(event):
+                    self.worker.cancel('play')
                     self.midi_player.stop()
-                    return True
+                    continue
                 elif self.buttons['maximize'].handle_event(event):
                     self.toggle_maximize()
-                    return True
+                    continue
         
             grid_handled = self.grid_editor.handle_event(event)
             if grid_handled:
@@ -680,27 +810,130 @@ class ChordGeneratorApp:
                 # 确保更新选中的和弦索引
                 self.selected_chord_idx = self.grid_editor.selected_chord_idx
                 self.update_chord_display()
-                return True
-    
-        # 处理MIDI播放事件 - 单独处理USEREVENT事件
-        midi_events = [e for e in pygame.event.get(pygame.USEREVENT)]
-        for event in midi_events:
-            if self.midi_player.handle_event(event):
-                return True
+                continue
             
         return True
 
+    def _step_history(self, redo: bool):
+        """撤销或重做一步，并切换到被修改的段落"""
+        section_name = self.history.redo() if redo else self.history.undo()
+        if section_name is None:
+            return
+        self.section_manager.current_section = section_name
+        self.progression = self.section_manager.get_current_progression()
+        self.grid_editor.set_progression(self.progression)
+        self.selected_chord_idx = self.grid_editor.selected_chord_idx
+        self.update_chord_display()
+
+    def _project_settings(self) -> ProjectSettings:
+        return ProjectSettings(self.key, self.bpm, self.chord_style, self.rhythm_type)
+
+    def _ask_project_path(self, save: bool) -> str:
+        """选择项目文件（对话框需在主线程中运行），取消时返回空字符串"""
+        import tkinter as tk
+        from tkinter import filedialog
+        root = tk.Tk()
+        root.withdraw()
+        options = dict(
+            defaultextension=PROJECT_EXTENSION,
+            filetypes=[("项目文件", f"*{PROJECT_EXTENSION}"), ("All files", "*.*")]
+        )
+        if save:
+            path = filedialog.asksaveasfilename(title="保存项目", **options)
+        else:
+            path = filedialog.askopenfilename(title="打开项目", **options)
+        root.destroy()
+        return path
+
+    def save_project(self, save_as: bool = False):
+        """保存项目，只写入有变化的段落；第一次保存或另存为时选择文件"""
+        try:
+            project = self.project_file
+            if project is None or save_as:
+                path = self._ask_project_path(save=True)
+                if not path:
+                    return
+                project = ProjectFile(path)
+            written = project.save(self.section_manager, self._project_settings())
+            # 尚未解码的段落改为从新文件读取，之后才能关闭原来的文件
+            project.adopt(self.section_manager)
+            if project is not self.project_file:
+                if self.project_file:
+                    self.project_file.close()
+                self.project_file = project
+            logger.info(f"项目已保存: {project.path} (写入{written}字节)")
+        except Exception as e:
+            logger.error(f"保存项目失败: {str(e)}")
+
+    def open_project(self):
+        """选择并打开项目文件"""
+        try:
+            path = self._ask_project_path(save=False)
+            if path:
+                self.load_project(path)
+        except Exception as e:
+            logger.error(f"打开项目失败: {str(e)}")
+
+    def load_project(self, path: str):
+        """载入项目，段落的和弦进行在切换到该段落时才解码"""
+        project = ProjectFile(path)
+        manager = SectionManager()
+        settings = project.load(manager)
+        if self.project_file:
+            self.project_file.close()
+        self.project_file = project
+        self._replace_sections(manager, settings)
+        self.journal.start(self.section_manager, settings)
+        logger.info(f"已打开项目: {path}")
+
+    def _recover_session(self):
+        """上次没有正常退出时从编辑日志恢复段落，然后开始记录本次会话"""
+        try:
+            manager = SectionManager()
+            settings = self.journal.recover(manager)
+            if settings is not None:
+                self._replace_sections(manager, settings)
+        except Exception as e:
+            logger.error(f"恢复上次会话失败: {str(e)}")
+        self.journal.start(self.section_manager, self._project_settings())
+
+    def _replace_sections(self, manager: SectionManager, settings: ProjectSettings):
+        """用manager中的段落和歌曲参数替换当前内容并刷新界面"""
+        self.section_manager.sections = manager.sections
+        self.section_manager.current_section = manager.current_section
+
+        self.key = settings.key
+        self.bpm = settings.bpm
+        self.chord_style = settings.style
+        self.rhythm_type = settings.rhythm
+        self.rhythm_selector.selected_rhythm = settings.rhythm
+        self.buttons['style_toggle'].text = "切换为分解和弦" if self.chord_style == "block" else "切换为柱式和弦"
+        self.midi_player.set_bpm(self.bpm)
+
+        self.progression = self.section_manager.get_current_progression()
+        self.history.reset()
+        self.grid_editor.set_progression(self.progression)
+        self.selected_chord_idx = self.grid_editor.selected_chord_idx
+        self.update_chord_display()
+        self._full_redraw = True
+
+    def _autosave(self, force: bool = False):
+        """定期把有变化的段落写入当前项目文件"""
+        now = pygame.time.get_ticks()
+        if self.project_file is None or (not force and now - self._last_autosave < AUTOSAVE_INTERVAL_MS):
+            return
+        self._last_autosave = now
+        try:
+            written = self.project_file.save(self.section_manager, self._project_settings())
+            if written:
+                logger.info(f"自动保存: {self.project_file.path} (写入{written}字节)")
+        except Exception as e:
+            logger.error(f"自动保存失败: {str(e)}")
+
     def export_midi(self):
-        """导出MIDI文件"""
+        """选择保存位置后在后台渲染并写入MIDI文件"""
         try:
-            midi = generate_progression_midi(
-                progression=self.progression,
-                key=self.key,
-                bpm=self.bpm,
-                style=self.chord_style,
-                rhythm=self.rhythm_type
-            )
-            # 让用户选择保存位置
+            # 让用户选择保存位置（对话框需在主线程中运行）
             import tkinter as tk
             from tkinter import filedialog
             root = tk.Tk()
@@ -710,79 +943,186 @@ class ChordGeneratorApp:
                 filetypes=[("MIDI files", "*.mid"), ("All files", "*.*")],
                 title="保存MIDI文件"
             )
+            root.destroy()
             if file_path:
-                midi.save(file_path)
-                logger.info(f"MIDI文件已保存到: {file_path}")
+                self.worker.submit(
+                    'export', self._write_midi_file, file_path, self.section_manager.snapshot(),
+                    self.key, self.bpm, self.chord_style, self.rhythm_type, supersede=False
+                )
         except Exception as e:
             logger.error(f"导出失败: {str(e)}")
 
+    def _layers(self) -> List[DirtyTracker]:
+        """按绘制顺序排列的可重绘组件"""
+        return [
+            self.piano_visualizer,
+            self.chord_display,
+            self.grid_editor,
+            self.style_selector,
+            self.structure_editor,
+            self.rhythm_editor,
+            self.rhythm_selector,
+            *self.buttons.values(),
+            *([self.profiler_overlay] if self.profiler.enabled else [])
+        ]
+    
+    def _invalidate_for_event(self, event: pygame.event.Event):
+        """根据输入事件标记需要重绘的组件"""
+        if event.type == pygame.MOUSEMOTION:
+            if any(event.buttons):
+                # 拖动滚动条等操作可能影响多个组件
+                self._full_redraw = True
+                return
+            
+            # 只有悬停效果会随鼠标移动变化
+            prev_pos = (event.pos[0] - event.rel[0], event.pos[1] - event.rel[1])
+            for layer in self._layers():
+                if layer.tracks_hover:
+                    bounds = layer.get_bounds()
+                    if bounds.collidepoint(event.pos) or bounds.collidepoint(prev_pos):
+                        layer.invalidate()
+        elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL,
+                            pygame.KEYDOWN, pygame.VIDEORESIZE, pygame.VIDEOEXPOSE):
+            # 点击、滚轮和按键会改变面板展开状态及控制参数
+            self._full_redraw = True
+    
+    def _sync_play_button(self):
+        """播放状态变化时更新播放按钮颜色"""
+        play_color = (120, 180, 100) if self.midi_player.is_playing else (90, 160, 70)
+        play_button = self.buttons['play']
+        if play_button.color != play_color:
+            play_button.color = play_color
+            play_button.hover_color = (play_color[0]+20, play_color[1]+20, play_color[2]+20)
+            play_button.invalidate()
+    
     def draw(self):
-        """绘制界面"""
+        """只重绘发生变化的区域，没有变化时不绘制"""
+        self._sync_play_button()
+        layers = self._layers()
+        
+        if self._full_redraw:
+            for layer in layers:
+                layer.pop_dirty_rects()
+            dirty_rects = [self.screen.get_rect()]
+        else:
+            dirty_rects = [rect for layer in layers for rect in layer.pop_dirty_rects()]
+        
+        if not dirty_rects:
+            return
+        
+        # 重绘脏区域内的所有图层，保持原有的叠放顺序
+        region = dirty_rects[0].unionall(dirty_rects[1:])
+        self.screen.set_clip(region)
+        self._draw_scene(region, layers)
+        self.screen.set_clip(None)
+        
+        with self.profiler.section('display'):
+            if self._full_redraw:
+                pygame.display.flip()
+                self._full_redraw = False
+            else:
+                pygame.display.update(dirty_rects)
+    
+    def _draw_scene(self, region: pygame.Rect, layers: List[DirtyTracker]):
+        """绘制与region相交的背景、组件和控制面板文字"""
         self.screen.fill((40, 40, 50))
-        pygame.draw.rect(self.screen, (60, 60, 80), self.ui_areas['control_panel'], border_radius=10)
-        
-        # 绘制标题
-        title_text = self.title_font.render("MIDI和弦生成器", True, (220, 220, 240))
-        self.screen.blit(title_text, self.control_elements['title'])
-        
-        # 绘制组件
-        self.piano_visualizer.draw(self.screen)
-        self.chord_display.draw(self.screen)
-        self.grid_editor.draw(self.screen)
-        self.style_selector.draw(self.screen)
-        self.structure_editor.draw(self.screen)
-        self.rhythm_editor.draw(self.screen)
-        self.rhythm_selector.draw(self.screen)  # 绘制节奏选择器
-        
-        # 绘制按钮
-        for button in self.buttons.values():
-            button.draw(self.screen)
+        control_panel = self.ui_areas['control_panel']
+        draw_controls = control_panel.colliderect(region)
+        
+        if draw_controls:
+            pygame.draw.rect(self.screen, (60, 60, 80), control_panel, border_radius=10)
             
-        # 更新播放按钮颜色
-        play_color = (120, 180, 100) if self.midi_player.is_playing else (90, 160, 70)
-        self.buttons['play'].color = play_color
-        self.buttons['play'].hover_color = (play_color[0]+20, play_color[1]+20, play_color[2]+20)
+            # 绘制标题
+            title_text = self.text_cache.render(self.title_font, "MIDI和弦生成器", (220, 220, 240))
+            self.screen.blit(title_text, self.control_elements['title'])
+        
+        # 绘制组件和按钮
+        for layer in layers:
+            if layer.get_bounds().colliderect(region):
+                with self.profiler.section(type(layer).__name__):
+                    layer.draw(self.screen)
+        
+        if not draw_controls:
+            return
         
-        # 绘制控制参数
-        bpm_text = self.ui_font.render("速度 (BPM):", True, (220, 220, 240))
+        with self.profiler.section('controls'):
+            self._draw_control_labels()
+    
+    def _draw_control_labels(self):
+        """绘制控制面板中的参数标签和数值"""
+        bpm_text = self.text_cache.render(self.ui_font, "速度 (BPM):", (220, 220, 240))
         self.screen.blit(bpm_text, self.control_elements['bpm_label'])
         
-        bpm_value = self.ui_font.render(f"{self.bpm:>3}", True, (255, 255, 255))
+        bpm_value = self.text_cache.render(self.ui_font, f"{self.bpm:>3}", (255, 255, 255))
         self.screen.blit(bpm_value, self.control_elements['bpm_value'])
         
-        duration_text = self.ui_font.render("时值 (小节):", True, (220, 220, 240))
+        duration_text = self.text_cache.render(self.ui_font, "时值 (小节):", (220, 220, 240))
         self.screen.blit(duration_text, self.control_elements['duration_label'])
         
-        duration_value = self.ui_font.render(f"{abs(self.default_duration):.2f}", True, (255, 255, 255))
+        duration_value = self.text_cache.render(self.ui_font, f"{abs(self.default_duration):.2f}", (255, 255, 255))
         self.screen.blit(duration_value, self.control_elements['duration_value'])
         
-        style_text = self.ui_font.render("当前风格:", True, (220, 220, 240))
+        style_text = self.text_cache.render(self.ui_font, "当前风格:", (220, 220, 240))
         self.screen.blit(style_text, self.control_elements['style_label'])
         
-        current_style = self.ui_font.render(
-            "柱式和弦" if self.chord_style == "block" else "分解和弦", 
-            True, 
+        current_style = self.text_cache.render(
+            self.ui_font,
+            "柱式和弦" if self.chord_style == "block" else "分解和弦",
             (255, 255, 255)
         )
         self.screen.blit(current_style, self.control_elements['style_value'])
         
         # 绘制节奏标签
-        rhythm_text = self.ui_font.render("节奏型:", True, (220, 220, 240))
+        rhythm_text = self.text_cache.render(self.ui_font, "节奏型:", (220, 220, 240))
         self.screen.blit(rhythm_text, self.control_elements['rhythm_label'])
+    
+    def _needs_active_loop(self) -> bool:
+        """播放或拖动时需要持续刷新"""
+        return self.midi_player.is_playing or any(pygame.mouse.get_pressed())
+    
+    def _next_events(self, clock: pygame.time.Clock) -> List[pygame.event.Event]:
+        """活动时按高帧率轮询，空闲时阻塞等待事件"""
+        if self._needs_active_loop():
+            clock.tick(ACTIVE_FPS)
+            return pygame.event.get()
         
-        pygame.display.flip()
+        event = pygame.event.wait(IDLE_WAIT_MS)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
     
     def run(self):
-        """主循环"""
+        """事件驱动的主循环"""
         clock = pygame.time.Clock()
         running = True
+        exited = False
         
         try:
             while running:
-                running = self.handle_events()
-                self.draw()
-                clock.tick(30)
+                events = self._next_events(clock)
+                self.profiler.begin_frame()
+                with self.profiler.section('handle_events'):
+                    running = self.handle_events(events)
+                self.midi_player.update()
+                self._autosave()
+                self.journal.capture(self.section_manager, self._project_settings())
+                with self.profiler.section('draw'):
+                    self.draw()
+                self.profiler.end_frame()
+                if self.profiler.enabled:
+                    # 浮层显示的是最新统计，每帧都需要重绘
+                    self.profiler_overlay.invalidate()
+            exited = True
         finally:
+            if self.profiler.trace_path:
+                self.profiler.dump_trace()
+            self._autosave(force=True)
+            if self.project_file:
+                self.project_file.close()
+            # 异常退出时保留恢复文件，下次启动时重放
+            self.journal.close(clean=exited)
+            self.worker.close()
+            self.midi_player.close()
             pygame.quit()
 
 if __name__ == "__main__":
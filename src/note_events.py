@@ -0,0 +1,84 @@
+# src/note_events.py
+from array import array
+from typing import Iterable, Iterator, Sequence, Tuple
+from mido import MidiTrack, Message
+
+NOTE_ON = 0x90
+NOTE_OFF = 0x80
+
+class NoteEventBuffer:
+    """按列存储的音符事件缓冲区，仅在输出时转换为MIDI消息"""
+    def __init__(self):
+        self.ticks = array('L')        # 绝对tick
+        self.status = array('B')       # 状态字节(含通道)
+        self.notes = array('B')
+        self.velocities = array('B')
+        self.end_tick = 0              # 下一个和弦的起始tick
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+    def add_hits(self, notes: Sequence[int], hit_ticks: Sequence[int], hit_velocities: Sequence[int]):
+        """追加一个和弦的所有击打：每次击打同时按下全部音符，经过指定tick后同时释放"""
+        count = len(notes)
+        tick = self.end_tick
+        ticks = []
+        velocities = []
+        for length, velocity in zip(hit_ticks, hit_velocities):
+            ticks += [tick] * count
+            tick += length
+            ticks += [tick] * count
+            velocities += [velocity] * (2 * count)
+
+        hits = len(hit_ticks)
+        self.ticks.extend(ticks)
+        self.status.extend(([NOTE_ON] * count + [NOTE_OFF] * count) * hits)
+        self.notes.extend(list(notes) * (2 * hits))
+        self.velocities.extend(velocities)
+        self.end_tick = tick
+
+    def copy(self) -> 'NoteEventBuffer':
+        """复制全部列，供其他线程在缓冲区继续被修改时安全读取"""
+        events = NoteEventBuffer()
+        events.ticks = array('L', self.ticks)
+        events.status = array('B', self.status)
+        events.notes = array('B', self.notes)
+        events.velocities = array('B', self.velocities)
+        events.end_tick = self.end_tick
+        return events
+
+    def shifted_ticks(self, offset: int) -> array:
+        """返回整体平移offset后的tick列（offset为0时直接返回原列）"""
+        if not offset:
+            return self.ticks
+        return array('L', [tick + offset for tick in self.ticks])
+
+    def append_block(self, block: 'NoteEventBuffer'):
+        """将另一个从0开始的事件块接到当前末尾"""
+        self.ticks.extend(block.shifted_ticks(self.end_tick))
+        self.status.extend(block.status)
+        self.notes.extend(block.notes)
+        self.velocities.extend(block.velocities)
+        self.end_tick += block.end_tick
+
+    @classmethod
+    def concat(cls, blocks: Iterable['NoteEventBuffer']) -> 'NoteEventBuffer':
+        """按顺序拼接多个事件块"""
+        events = cls()
+        for block in blocks:
+            events.append_block(block)
+        return events
+
+    def iter_events(self) -> Iterator[Tuple[int, int, int, int]]:
+        """按顺序产生 (delta时间, 状态字节, 音高, 力度)"""
+        prev_tick = 0
+        for tick, status, note, velocity in zip(self.ticks, self.status, self.notes, self.velocities):
+            yield tick - prev_tick, status, note, velocity
+            prev_tick = tick
+
+    def to_track(self, track: MidiTrack):
+        """将缓冲区事件追加到MidiTrack"""
+        track.extend([
+            Message('note_on' if status == NOTE_ON else 'note_off', note=note, velocity=velocity, time=delta)
+            for delta, status, note, velocity in self.iter_events()
+        ])
@@ -0,0 +1,429 @@
+# src/project_file.py
+import mmap
+import os
+import struct
+import sys
+import threading
+import weakref
+import zlib
+from array import array
+from dataclasses import dataclass, replace
+from typing import Collection, Dict, List, Optional, Tuple
+from custom_types import ChordStyle, SongSection
+from song_structure.chord_list import (
+    CHORD_TYPE_CODES, COLUMN_TYPECODES, RHYTHMS, ROMANS, ChordList
+)
+from song_structure.section_manager import SectionManager
+
+MAGIC = b'MCPJ'
+VERSION = 1
+
+# 文件头: 魔数, 版本, 保留, 索引偏移, 索引长度, 索引CRC32
+_HEADER = struct.Struct('<4sHHQLL')
+# 段落索引项: 小节数, BPM, 和弦数, 和弦数据偏移
+_SECTION = struct.Struct('<HHLQ')
+_U16 = struct.Struct('<H')
+
+# 每个和弦在文件中占用的字节数，各列依次存放
+CHORD_BYTES = sum(array(typecode).itemsize for typecode in COLUMN_TYPECODES)
+# 驻留编码的列（罗马数字、和弦类型、节奏）在CHORD_FIELDS中的位置
+_CODED_COLUMNS = (0, 1, 4)
+
+# 失效数据超过该大小且占文件一半以上时，保存时整体重写
+COMPACT_MIN_BYTES = 64 * 1024
+
+@dataclass
+class ProjectSettings:
+    """与段落一起保存的歌曲参数"""
+    key: str = 'C'
+    bpm: int = 120
+    style: ChordStyle = 'block'
+    rhythm: str = 'straight'
+
+class _FileCodes:
+    """文件内编码表与进程内驻留表之间的转换，文件编码表只追加，已写入的数据始终有效"""
+    def __init__(self, interned, names: Optional[List[Optional[str]]] = None):
+        self.interned = interned
+        self.names = list(interned.names if names is None else names)
+        self.index = {name: code for code, name in enumerate(self.names)}
+
+    def decode_table(self) -> bytes:
+        """文件编码 -> 进程编码的bytes.translate转换表"""
+        table = bytearray(256)
+        for code, name in enumerate(self.names):
+            table[code] = self.interned.code(name)
+        return bytes(table)
+
+    def encode_table(self) -> bytes:
+        """进程编码 -> 文件编码的转换表，文件中没有的名称追加到表尾"""
+        table = bytearray(256)
+        for code, name in enumerate(self.interned.names):
+            file_code = self.index.get(name)
+            if file_code is None:
+                file_code = len(self.names)
+                if file_code > 0xFF:
+                    raise ValueError(f"项目文件编码表已满，无法加入: {name}")
+                self.names.append(name)
+                self.index[name] = file_code
+            table[code] = file_code
+        return bytes(table)
+
+class _LazySection(dict):
+    """和弦进行在第一次访问时才从映射的文件中解码的段落
+
+    decoded_progression保存解码出的原始内容（写时复制副本），撤销历史和编辑日志
+    以它为基线，解码后的第一次修改也能被记录。解码在项目文件的锁内进行，
+    多个线程同时访问时只解码一次，各线程拿到的是同一个ChordList。
+    """
+    __slots__ = ('_project', '_offset', '_count', 'decoded_progression', '__weakref__')
+
+    def __missing__(self, key):
+        if key != 'progression':
+            raise KeyError(key)
+        with self._project._lock:
+            progression = dict.get(self, 'progression')
+            if progression is None:
+                progression = self._project._decode_section(self)
+                self['progression'] = progression
+                self.decoded_progression = progression.copy()
+        return progression
+
+@dataclass
+class _SavedSection:
+    """上次保存时段落的状态，用于判断是否需要重新写入"""
+    section: SongSection
+    meta: Tuple
+    offset: int
+    count: int
+    progression: Optional[ChordList] = None   # 已解码或已写入的和弦进行的写时复制副本
+
+def section_meta(section: SongSection) -> Tuple:
+    return section['type'], section['length'], section['bpm']
+
+def pack_str(out: bytearray, text: Optional[str]):
+    data = (text or '').encode('utf-8')
+    out += _U16.pack(len(data))
+    out += data
+
+class BinaryReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt: struct.Struct) -> Tuple:
+        values = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def str(self) -> str:
+        length, = self.unpack(_U16)
+        text = self.data[self.pos:self.pos + length].decode('utf-8')
+        self.pos += length
+        return text
+
+class ProjectFile:
+    """带段落索引的二进制项目文件
+
+    布局: 文件头 | 各段落的和弦数据 | 索引。索引保存歌曲参数、编码表和每个段落的
+    位置。载入时只读取索引，和弦数据通过mmap在段落第一次被访问时解码。
+    保存时只把有变化的段落追加到文件末尾，再写入新索引，最后更新文件头指向它，
+    中途中断时旧的文件头仍指向完整的旧索引。失效数据过多时整体重写。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._codes = tuple(_FileCodes(interned) for interned in (ROMANS, CHORD_TYPE_CODES, RHYTHMS))
+        self._saved: Dict[str, _SavedSection] = {}
+        self._state: Optional[Tuple] = None       # 上次保存的 (参数, 段落顺序, 当前段落)
+        self._live_bytes = 0
+        self._file_size = 0
+        # 从本文件读取的段落（按id弱引用），整体重写文件后更新它们的偏移
+        self._lazy: 'weakref.WeakValueDictionary[int, _LazySection]' = weakref.WeakValueDictionary()
+        # 编辑日志在后台线程中保存快照，与主线程的解码互斥
+        self._lock = threading.RLock()
+
+    def close(self):
+        """关闭映射，之后不能再解码尚未访问的段落"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open_map(self):
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._file_size = len(self._map)
+
+    def signature(self) -> bytes:
+        """磁盘上的文件头，每次写入新索引后都会变化，可用来判断文件是否被更新过"""
+        with open(self.path, 'rb') as f:
+            return f.read(_HEADER.size)
+
+    def load(self, manager: SectionManager) -> ProjectSettings:
+        """读取索引并替换manager中的段落，返回歌曲参数"""
+        with self._lock:
+            return self._load(manager)
+
+    def _load(self, manager: SectionManager) -> ProjectSettings:
+        self.close()
+        self._open_map()
+        magic, version, _, index_offset, index_size, index_crc = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是项目文件: {self.path}")
+        if version > VERSION:
+            raise ValueError(f"不支持的项目文件版本: {version}")
+        data = self._map[index_offset:index_offset + index_size]
+        if zlib.crc32(data) != index_crc:
+            raise ValueError(f"项目文件索引已损坏: {self.path}")
+
+        reader = BinaryReader(data)
+        settings = ProjectSettings(reader.str(), *reader.unpack(_U16), reader.str(), reader.str())
+        current_section = reader.str()
+        tables = []
+        for interned in (ROMANS, CHORD_TYPE_CODES, RHYTHMS):
+            count, = reader.unpack(_U16)
+            tables.append(_FileCodes(interned, [reader.str() or None for _ in range(count)]))
+        self._codes = tuple(tables)
+
+        manager.sections = {}
+        self._saved = {}
+        self._live_bytes = _HEADER.size + index_size
+        section_count, = reader.unpack(_U16)
+        for _ in range(section_count):
+            name, section_type = reader.str(), reader.str()
+            length, bpm, count, offset = reader.unpack(_SECTION)
+            section = _LazySection(name=name, type=section_type, length=length, bpm=bpm)
+            section._project, section._offset, section._count = self, offset, count
+            self._lazy[id(section)] = section
+            manager.sections[name] = section
+            self._saved[name] = _SavedSection(section, section_meta(section), offset, count)
+            self._live_bytes += count * CHORD_BYTES
+
+        if current_section not in manager.sections:
+            current_section = next(iter(manager.sections), '')
+        manager.current_section = current_section
+        self._state = (replace(settings), list(manager.sections), manager.current_section)
+        return settings
+
+    def _decode(self, offset: int, count: int) -> ChordList:
+        data = self._map[offset:offset + count * CHORD_BYTES]
+        columns = []
+        pos = 0
+        coded = dict(zip(_CODED_COLUMNS, self._codes))
+        for field, typecode in enumerate(COLUMN_TYPECODES):
+            column = array(typecode)
+            size = column.itemsize * count
+            chunk = data[pos:pos + size]
+            if field in coded:
+                chunk = chunk.translate(coded[field].decode_table())
+            column.frombytes(chunk)
+            if column.itemsize > 1 and sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            pos += size
+        return ChordList.from_columns(columns)
+
+    def _decode_section(self, section: _LazySection) -> ChordList:
+        with self._lock:
+            progression = self._decode(section._offset, section._count)
+            saved = self._saved.get(section['name'])
+            if saved is not None and saved.section is section:
+                saved.progression = progression.copy()
+            return progression
+
+    def _encode(self, progression: ChordList, tables: Dict[int, bytes]) -> bytes:
+        chunks = []
+        for field, column in enumerate(progression.columns()):
+            if column.itemsize > 1 and sys.byteorder == 'big':
+                column = array(column.typecode, column)
+                column.byteswap()
+            chunk = column.tobytes()
+            if field in tables:
+                chunk = chunk.translate(tables[field])
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _section_data(self, section: SongSection, tables: Dict[int, bytes]) -> Tuple[bytes, int]:
+        """段落在本文件中的数据与和弦数，尚未解码的段落直接复制映射中的原始数据"""
+        if not (isinstance(section, _LazySection) and 'progression' not in section):
+            progression = section['progression']
+            return self._encode(progression, tables), len(progression)
+
+        source, count = section._project, section._count
+        data = source._map[section._offset:section._offset + count * CHORD_BYTES]
+        if source is self:
+            # 本文件的编码表只追加，旧数据仍然有效
+            return data, count
+
+        # 来自另一个项目文件：编码列经进程编码转换为本文件的编码
+        chunks = []
+        pos = 0
+        for field, typecode in enumerate(COLUMN_TYPECODES):
+            size = array(typecode).itemsize * count
+            chunk = data[pos:pos + size]
+            if field in tables:
+                codes = self._codes[_CODED_COLUMNS.index(field)]
+                chunk = chunk.translate(source._codes[_CODED_COLUMNS.index(field)].decode_table())
+                chunk = chunk.translate(codes.encode_table())
+            chunks.append(chunk)
+            pos += size
+        return b''.join(chunks), count
+
+    def adopt(self, manager: SectionManager) -> int:
+        """让manager中来自其他项目文件、尚未解码的段落改为从本文件读取，返回接管的段落数
+
+        须在save之后调用；之后即可关闭原来的项目文件。
+        """
+        with self._lock:
+            adopted = 0
+            for name, section in manager.sections.items():
+                saved = self._saved.get(name)
+                if (isinstance(section, _LazySection) and 'progression' not in section and section._project is not self
+                        and saved is not None and saved.section is section):
+                    section._project, section._offset, section._count = self, saved.offset, saved.count
+                    self._lazy[id(section)] = section
+                    adopted += 1
+            return adopted
+
+    def _is_mapped(self, section: SongSection) -> bool:
+        """段落是否为本文件中尚未解码的段落"""
+        return isinstance(section, _LazySection) and section._project is self and 'progression' not in section
+
+    def _unchanged(self, saved: _SavedSection, section: SongSection) -> bool:
+        if saved.section is not section or saved.meta != section_meta(section):
+            return False
+        if 'progression' not in section:      # 从未解码过
+            return True
+        return saved.progression is not None and section['progression'] == saved.progression
+
+    def _build_index(self, settings: ProjectSettings, manager: SectionManager,
+                     locations: List[Tuple[SongSection, int, int]]) -> bytes:
+        index = bytearray()
+        pack_str(index, settings.key)
+        index += _U16.pack(settings.bpm)
+        pack_str(index, settings.style)
+        pack_str(index, settings.rhythm)
+        pack_str(index, manager.current_section)
+        for codes in self._codes:
+            index += _U16.pack(len(codes.names))
+            for name in codes.names:
+                pack_str(index, name)
+        index += _U16.pack(len(locations))
+        for section, offset, count in locations:
+            pack_str(index, section['name'])
+            pack_str(index, section['type'])
+            index += _SECTION.pack(section['length'], section['bpm'], count, offset)
+        return bytes(index)
+
+    def save(self, manager: SectionManager, settings: ProjectSettings, compact: bool = False,
+             unchanged: Collection[str] = ()) -> int:
+        """保存项目，只写入有变化的段落，返回写入的字节数（没有变化时为0）
+
+        unchanged中的段落由调用方保证与上次保存时相同，直接沿用而不读取其和弦，
+        这些段落可以只是带有属性的副本。
+        """
+        with self._lock:
+            return self._save(manager, settings, compact, unchanged)
+
+    def _save(self, manager: SectionManager, settings: ProjectSettings, compact: bool,
+              unchanged: Collection[str]) -> int:
+        state = (settings, list(manager.sections), manager.current_section)
+        reuse = {
+            name for name, section in manager.sections.items()
+            if name in self._saved and (name in unchanged or self._unchanged(self._saved[name], section))
+        }
+        exists = self._map is not None and os.path.exists(self.path)
+        if exists and not compact and len(reuse) == len(manager.sections) and state == self._state:
+            return 0
+
+        garbage = self._file_size - self._live_bytes
+        full = compact or not exists or (garbage > COMPACT_MIN_BYTES and garbage * 2 > self._file_size)
+        tables = dict(zip(_CODED_COLUMNS, (codes.encode_table() for codes in self._codes)))
+
+        written = 0
+        locations = []
+        saved = {}
+        if full:
+            moved = {}    # 本文件中原始数据的旧偏移 -> 新偏移
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(bytes(_HEADER.size))
+                for name, section in manager.sections.items():
+                    if name in reuse and exists:
+                        # 未变化的段落直接复制本文件中的原始数据
+                        old = self._saved[name]
+                        data, count = self._map[old.offset:old.offset + old.count * CHORD_BYTES], old.count
+                        moved[old.offset] = f.tell()
+                    else:
+                        if self._is_mapped(section):
+                            moved[section._offset] = f.tell()
+                        data, count = self._section_data(section, tables)
+                    locations.append((section, f.tell(), count))
+                    f.write(data)
+                written = self._finish(f, settings, manager, locations)
+            self._relocate(moved, lambda: os.replace(tmp_path, self.path))
+        else:
+            with open(self.path, 'r+b') as f:
+                f.seek(0, os.SEEK_END)
+                start = f.tell()
+                for name, section in manager.sections.items():
+                    if name in reuse:
+                        old = self._saved[name]
+                        locations.append((section, old.offset, old.count))
+                    else:
+                        data, count = self._section_data(section, tables)
+                        locations.append((section, f.tell(), count))
+                        f.write(data)
+                written = self._finish(f, settings, manager, locations) - start
+            # 重新映射，让追加的数据也在映射范围内（整体重写时会直接复制其中未变化的段落）
+            self.close()
+            self._open_map()
+
+        for section, offset, count in locations:
+            name = section['name']
+            previous = self._saved.get(name)
+            if name in reuse and previous is not None and previous.section is section:
+                saved[name] = replace(previous, offset=offset)
+            else:
+                progression = section['progression'].copy() if 'progression' in section else None
+                saved[name] = _SavedSection(section, section_meta(section), offset, count, progression)
+            self._live_bytes += count * CHORD_BYTES
+        self._saved = saved
+        self._state = (replace(settings), list(manager.sections), manager.current_section)
+        return written
+
+    def _relocate(self, moved: Dict[int, int], replace_file):
+        """替换文件后让本文件中尚未解码的段落指向新偏移
+
+        不在新文件中的段落（例如已从manager中删除）先解码，不会在段落仍引用映射时关闭它。
+        """
+        lazy = [section for section in self._lazy.values() if self._is_mapped(section)]
+        for section in lazy:
+            if section._offset not in moved:
+                section['progression']
+        self.close()
+        replace_file()
+        self._open_map()
+        for section in lazy:
+            if section._offset in moved and 'progression' not in section:
+                section._offset = moved[section._offset]
+
+    def _finish(self, f, settings: ProjectSettings, manager: SectionManager,
+                locations: List[Tuple[SongSection, int, int]]) -> int:
+        """在文件末尾写入索引，落盘后再更新文件头，返回文件长度"""
+        index = self._build_index(settings, manager, locations)
+        index_offset = f.tell()
+        f.write(index)
+        end = f.tell()
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, index_offset, len(index), zlib.crc32(index)))
+        f.flush()
+        os.fsync(f.fileno())
+        self._live_bytes = _HEADER.size + len(index)
+        return end
@@ -0,0 +1,81 @@
+# src/render_cache.py
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from chord_generator import generate_progression_bytes
+from custom_types import ChordConfig, ChordStyle
+from song_structure.chord_list import ChordList
+
+logger = logging.getLogger(__name__)
+
+class RenderCache:
+    """以内容哈希为键的MIDI渲染缓存，内容未变化时跳过生成"""
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(progression: List[ChordConfig], key: str, bpm: int,
+                 style: ChordStyle, rhythm: str) -> str:
+        """根据和弦进行与播放参数生成稳定的哈希键
+
+        progression也可以是按顺序排列的各段落ChordList（整首歌曲）。
+        """
+        # ChordList直接使用紧凑的列字节，免去逐个和弦序列化
+        if isinstance(progression, ChordList):
+            chords = progression.key().hex()
+        elif progression and all(isinstance(section, ChordList) for section in progression):
+            chords = [section.key().hex() for section in progression]
+        else:
+            chords = progression
+        payload = json.dumps(
+            [chords, key, bpm, style, rhythm],
+            sort_keys=True, ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[bytes]:
+        """查询缓存，命中时将条目移到最近使用位置"""
+        data = self._entries.get(cache_key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(cache_key)
+        self.hits += 1
+        return data
+
+    def put(self, cache_key: str, data: bytes):
+        """写入缓存，超出上限时淘汰最久未使用的条目"""
+        self._entries[cache_key] = data
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def render(self, progression: List[ChordConfig], key: str = 'C', bpm: int = 120,
+               style: ChordStyle = 'block', rhythm: str = 'straight',
+               generate: Optional[Callable[[], bytes]] = None) -> bytes:
+        """返回渲染好的MIDI字节，未命中时调用generate（默认完整生成）并缓存"""
+        cache_key = self.make_key(progression, key, bpm, style, rhythm)
+        data = self.get(cache_key)
+        if data is None:
+            if generate is not None:
+                data = generate()
+            else:
+                data = generate_progression_bytes(progression, key, bpm, style, rhythm)
+            self.put(cache_key, data)
+        logger.debug(f"渲染缓存: {self.stats()}")
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        """命中/未命中计数与当前条目数"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def clear(self):
+        """清空缓存和计数"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,85 @@
+# src/render_worker.py
+import itertools
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class WorkerJob:
+    job_id: int
+    kind: str           # 任务类别，如 play / export / edit
+    generation: int     # 提交时该类别的代次，用于判断是否已被新任务取代
+    func: Callable[..., Any]
+    args: Tuple[Any, ...]
+
+@dataclass
+class JobResult:
+    job_id: int
+    kind: str
+    value: Any = None
+    error: Optional[str] = None
+
+class RenderWorker:
+    """在后台线程中按提交顺序执行渲染、保存等任务，完成后通过on_done回调通知
+
+    同一类别的新任务会取代尚未完成的旧任务：旧任务若还在队列中则直接跳过，
+    若正在执行则丢弃其结果。所有任务在同一个线程中串行执行，
+    因此任务函数访问的渲染器和缓存不需要额外加锁。
+    """
+    def __init__(self, on_done: Callable[[JobResult], None], name: str = 'render-worker'):
+        self.on_done = on_done
+        self._queue: "queue.Queue[Optional[WorkerJob]]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, supersede: bool = True) -> int:
+        """提交任务并返回任务编号；supersede为True时取代同类别的未完成任务"""
+        with self._lock:
+            generation = self._generations.get(kind, 0)
+            if supersede:
+                generation += 1
+                self._generations[kind] = generation
+            job = WorkerJob(next(self._ids), kind, generation, func, args)
+        self._queue.put(job)
+        return job.job_id
+
+    def cancel(self, kind: str):
+        """取消指定类别所有未完成的任务"""
+        with self._lock:
+            self._generations[kind] = self._generations.get(kind, 0) + 1
+
+    def _is_current(self, job: WorkerJob) -> bool:
+        with self._lock:
+            return job.generation == self._generations.get(job.kind, 0)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if not self._is_current(job):
+                logger.debug(f"跳过已被取代的任务: {job.kind}#{job.job_id}")
+                continue
+
+            try:
+                result = JobResult(job.job_id, job.kind, value=job.func(*job.args))
+            except Exception as e:
+                logger.exception(f"后台任务失败: {job.kind}#{job.job_id}")
+                result = JobResult(job.job_id, job.kind, error=f"{type(e).__name__}: {e}")
+
+            if not self._is_current(job):
+                logger.debug(f"丢弃已被取代的任务结果: {job.kind}#{job.job_id}")
+                continue
+            self.on_done(result)
+
+    def close(self, timeout: float = 2.0):
+        """处理完已提交的任务后停止线程"""
+        self._queue.put(None)
+        self._thread.join(timeout)
@@ -1,6 +1,12 @@
 # src/rhythm/__init__.py
 from .types import RhythmType
 from .handler import RhythmHandler
-from .editor import RhythmEditor
 
-__all__ = ['RhythmType', 'RhythmHandler', 'RhythmEditor']
\ No newline at end of file
+__all__ = ['RhythmType', 'RhythmHandler', 'RhythmEditor']
+
+def __getattr__(name):
+    # RhythmEditor依赖pygame，按需加载，使生成核心可在无界面环境下导入
+    if name == 'RhythmEditor':
+        from .editor import RhythmEditor
+        return RhythmEditor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,14 +2,18 @@
 import pygame
 from typing import Dict, List
 from .types import RHYTHM_TYPES
+from utils.dirty_rect import DirtyTracker
+from utils.font_manager import FontManager
+from utils.text_cache import TextCache
 
-class RhythmEditor:
+class RhythmEditor(DirtyTracker):
     """独立的节奏编辑器，通过事件与主程序交互"""
     def __init__(self, rect: pygame.Rect):
         self.rect = rect
         self.rhythms: Dict[int, str] = {}  # {chord_index: rhythm_type}
         self.active_index = -1
-        self.font = pygame.font.SysFont('Arial', 16)
+        self.font = FontManager().get_font(16)
+        self.text_cache = TextCache()
         
         # 滚动条相关
         self.scroll_offset = 0
@@ -26,6 +30,7 @@ class RhythmEditor:
         
     def set_rhythm(self, index: int, rhythm: str):
         self.rhythms[index] = rhythm
+        self.invalidate()
         
     def get_rhythm(self, index: int) -> str:
         return self.rhythms.get(index, 'straight')
@@ -114,7 +119,7 @@ class RhythmEditor:
             if y_pos < self.rect.y or y_pos > self.rect.bottom - 20:
                 continue
                 
-            text = self.font.render(f"{i}:{rhythm}", True, (255,255,255))
+            text = self.text_cache.render(self.font, f"{i}:{rhythm}", (255,255,255))
             surface.blit(text, (self.rect.x+5, y_pos))
         
         # 恢复裁剪区域
@@ -1,5 +1,6 @@
 # src/rhythm/types.py
-from typing import Literal
+from fractions import Fraction
+from typing import Dict, List, Literal, Tuple, Union
 
 RhythmType = Literal[
     'straight',       # 标准节奏
@@ -16,17 +17,24 @@ RhythmType = Literal[
     'kpop_sync'       # 韩式流行同步节奏
 ]
 
-RHYTHM_TYPES = [
-    'straight',
-    'triplet',
-    'swing',
-    'shuffle',
-    'acg_8beat',
-    'acg_16beat',
-    'pop_ballad',
-    'rock_4beat',
-    'jazz_waltz',
-    'citypop',
-    'anime_op',
-    'kpop_sync'
-]
\ No newline at end of file
+# 节奏型中的一次击打: (占和弦时值的比例, 力度系数)
+# 均分的比例用Fraction表示，以保持与整除相同的tick取整结果
+RhythmHit = Tuple[Union[float, Fraction], float]
+RhythmPattern = List[RhythmHit]
+
+RHYTHM_PATTERNS: Dict[str, RhythmPattern] = {
+    'straight': [(1, 1.0)],
+    'triplet': [(Fraction(1, 3), 1.0)] * 3,
+    'swing': [(0.6, 1.0), (0.4, 0.9)],
+    'shuffle': [(0.75, 1.0), (0.25, 0.8)],
+    'acg_8beat': [(Fraction(1, 2), 0.95)] * 2,
+    'acg_16beat': [(0.3, 0.9), (0.2, 0.8), (0.5, 1.0)],
+    'pop_ballad': [(0.7, 1.0), (0.3, 0.7)],
+    'rock_4beat': [(Fraction(1, 4), 1.0)] + [(Fraction(1, 4), 0.85)] * 3,
+    'jazz_waltz': [(Fraction(1, 3), 1.0), (Fraction(1, 3), 0.8), (Fraction(1, 3), 0.7)],
+    'citypop': [(0.4, 0.9), (0.2, 0.7), (0.4, 0.95)],
+    'anime_op': [(0.4, 1.0), (0.2, 0.6), (0.3, 0.9), (0.1, 0.5)],
+    'kpop_sync': [(0.25, 0.7), (0.25, 1.0), (0.5, 0.9)]
+}
+
+RHYTHM_TYPES = list(RHYTHM_PATTERNS)
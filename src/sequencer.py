@@ -0,0 +1,323 @@
+# src/sequencer.py
+import abc
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+import mido
+from chord_generator import DEFAULT_TICKS_PER_BEAT
+from note_events import NOTE_OFF, NOTE_ON, NoteEventBuffer
+
+logger = logging.getLogger(__name__)
+
+# 实时输出端口：null / virtual / virtual:<名称> / 系统MIDI输出端口名称
+OUTPUT_ENV = 'MIDI_CREATER_OUTPUT'
+
+# 距离事件时间不足SPIN_SECONDS时在锁外短睡，只在最后SPIN_FINAL_SECONDS内自旋，以获得亚毫秒级精度
+SPIN_SECONDS = 0.002
+SPIN_FINAL_SECONDS = 0.0002
+
+class MidiOutput(abc.ABC):
+    """实时输出的接收端"""
+    @abc.abstractmethod
+    def send(self, status: int, note: int, velocity: int):
+        pass
+
+    def close(self):
+        pass
+
+class NullOutput(MidiOutput):
+    """丢弃消息的输出，可选记录发送时间，用于测试和测量"""
+    def __init__(self, record: bool = False):
+        self.record = record
+        self.messages: List[Tuple[float, int, int, int]] = []
+
+    def send(self, status: int, note: int, velocity: int):
+        if self.record:
+            self.messages.append((time.perf_counter(), status, note, velocity))
+
+class MidoOutput(MidiOutput):
+    """通过mido发送到系统MIDI端口或虚拟端口"""
+    def __init__(self, name: Optional[str] = None, virtual: bool = False):
+        self.port = mido.open_output(name, virtual=virtual)
+
+    def send(self, status: int, note: int, velocity: int):
+        self.port.send(mido.Message.from_bytes([status, note, velocity]))
+
+    def close(self):
+        self.port.close()
+
+def open_output(spec: str) -> MidiOutput:
+    """按描述打开输出：null、virtual、virtual:<名称>，其余视为系统端口名称"""
+    if spec == 'null':
+        return NullOutput()
+    if spec == 'virtual' or spec.startswith('virtual:'):
+        name = spec.partition(':')[2] or 'MIDI和弦生成器'
+        return MidoOutput(name, virtual=True)
+    return MidoOutput(spec)
+
+class JitterStats:
+    """事件实际发送时间相对计划时间的偏差统计"""
+    def __init__(self, window: int = 4096):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, lateness: float):
+        self._samples.append(lateness)
+
+    def clear(self):
+        self._samples.clear()
+
+    def summary(self) -> Dict[str, float]:
+        """样本数及均值、p50、p99、最大偏差（毫秒）"""
+        samples = sorted(self._samples)
+        if not samples:
+            return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        def pick(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+        return {
+            'count': len(samples),
+            'mean': sum(samples) / len(samples) * 1000,
+            'p50': pick(0.50),
+            'p99': pick(0.99),
+            'max': samples[-1] * 1000
+        }
+
+class Sequencer:
+    """在独立线程中按单调时钟发送事件，支持即时启停、定位、循环区间和实时变速
+
+    事件以tick保存，速度只影响tick到时间的换算，因此改变BPM不需要重新渲染。
+    """
+    def __init__(self, output: MidiOutput, bpm: int = 120,
+                 ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT,
+                 on_finished: Optional[Callable[[], None]] = None):
+        self.output = output
+        self.ticks_per_beat = ticks_per_beat
+        self.on_finished = on_finished
+        self.jitter = JitterStats()
+
+        self._bpm = bpm
+        self._events = NoteEventBuffer()
+        self._index = 0
+        self._position = 0                 # 停止时的tick位置
+        self._anchor_time = 0.0            # 播放时：_anchor_tick对应的时钟时间
+        self._anchor_tick = 0
+        self._loop: Optional[Tuple[int, int]] = None
+        self._playing = False
+        self._closed = False
+        self._version = 0                  # 每次状态变化递增，用于放弃自旋期间过期的计划
+        self._active: Set[Tuple[int, int]] = set()   # 正在发声的 (通道, 音高)
+
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='sequencer', daemon=True)
+        self._thread.start()
+
+    @property
+    def bpm(self) -> int:
+        return self._bpm
+
+    @property
+    def is_playing(self) -> bool:
+        return self._playing
+
+    @property
+    def _seconds_per_tick(self) -> float:
+        return 60.0 / (self._bpm * self.ticks_per_beat)
+
+    def _tick_time(self, tick: int) -> float:
+        return self._anchor_time + (tick - self._anchor_tick) * self._seconds_per_tick
+
+    def _current_tick(self, now: float) -> int:
+        if not self._playing:
+            return self._position
+        return max(0, int(self._anchor_tick + (now - self._anchor_time) / self._seconds_per_tick))
+
+    @property
+    def position(self) -> int:
+        """当前播放位置（tick）"""
+        with self._cond:
+            return self._current_tick(time.perf_counter())
+
+    def _changed(self):
+        self._version += 1
+        self._cond.notify_all()
+
+    def _send(self, status: int, note: int, velocity: int):
+        self.output.send(status, note, velocity)
+        channel = status & 0x0F
+        if status & 0xF0 == NOTE_ON and velocity > 0:
+            self._active.add((channel, note))
+        else:
+            self._active.discard((channel, note))
+
+    def _release_notes(self):
+        """关闭所有正在发声的音符"""
+        for channel, note in sorted(self._active):
+            self.output.send(NOTE_OFF | channel, note, 0)
+        self._active.clear()
+
+    def _move_to(self, tick: int, now: float):
+        self._release_notes()
+        self._index = bisect.bisect_left(self._events.ticks, tick)
+        self._position = tick
+        self._anchor_time = now
+        self._anchor_tick = tick
+
+    def load(self, events: NoteEventBuffer, bpm: Optional[int] = None):
+        """载入新的事件序列，停止当前播放并回到开头
+
+        音序器线程会直接读取events，调用方之后不能再修改它（需要时先copy）。
+        """
+        with self._cond:
+            self._playing = False
+            self._events = events
+            if bpm is not None:
+                self._bpm = bpm
+            if self._loop and self._loop[0] >= events.end_tick:
+                self._loop = None
+            self._move_to(0, time.perf_counter())
+            self._changed()
+
+    def play(self, start_tick: Optional[int] = None):
+        """从start_tick（默认为当前位置）开始播放"""
+        with self._cond:
+            tick = self._current_tick(time.perf_counter()) if start_tick is None else start_tick
+            self._move_to(tick, time.perf_counter())
+            self._playing = True
+            self.jitter.clear()
+            self._changed()
+
+    def pause(self):
+        """暂停并保留当前位置"""
+        with self._cond:
+            self._position = self._current_tick(time.perf_counter())
+            self._playing = False
+            self._release_notes()
+            self._changed()
+
+    def stop(self):
+        """立即停止并回到开头"""
+        with self._cond:
+            self._playing = False
+            self._move_to(0, time.perf_counter())
+            self._changed()
+
+    def seek(self, tick: int):
+        """跳转到指定tick，播放状态不变"""
+        with self._cond:
+            self._move_to(max(0, tick), time.perf_counter())
+            self._changed()
+
+    def set_bpm(self, bpm: int):
+        """实时改变速度，从当前位置起按新速度继续"""
+        with self._cond:
+            now = time.perf_counter()
+            tick = self._current_tick(now)
+            # 以当前位置为新的锚点，已经计划但未发送的事件按新速度重新换算
+            self._anchor_time = self._tick_time(tick) if self._playing else now
+            self._anchor_tick = tick
+            self._bpm = bpm
+            self._changed()
+
+    def set_loop(self, start_tick: Optional[int], end_tick: Optional[int] = None):
+        """设置循环区间[start_tick, end_tick)，start_tick为None时取消循环"""
+        with self._cond:
+            if start_tick is None:
+                self._loop = None
+            else:
+                end_tick = self._events.end_tick if end_tick is None else end_tick
+                if not 0 <= start_tick < end_tick:
+                    raise ValueError(f"无效的循环区间: {start_tick}-{end_tick}")
+                self._loop = (start_tick, end_tick)
+            self._changed()
+
+    def _next_due(self) -> Tuple[Optional[float], bool]:
+        """下一个动作的计划时间以及是否为循环回绕；播放结束时返回(None, False)"""
+        ticks = self._events.ticks
+        at_end = self._index >= len(ticks)
+        if self._loop and (at_end or ticks[self._index] >= self._loop[1]):
+            return self._tick_time(self._loop[1]), True
+        if at_end:
+            return None, False
+        return self._tick_time(ticks[self._index]), False
+
+    def _send_due_events(self, due: float):
+        """发送所有计划在同一tick的事件"""
+        events = self._events
+        ticks = events.ticks
+        tick = ticks[self._index]
+        end = len(ticks)
+        i = self._index
+        while i < end and ticks[i] == tick:
+            self._send(events.status[i], events.notes[i], events.velocities[i])
+            self.jitter.add(time.perf_counter() - due)
+            i += 1
+        self._index = i
+
+    def _run(self):
+        while True:
+            finished = False
+            with self._cond:
+                while not self._closed and not self._playing:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+                due, wrap = self._next_due()
+                if due is None:
+                    self._playing = False
+                    self._position = self._events.end_tick
+                    self._release_notes()
+                    finished = True
+                else:
+                    remaining = due - time.perf_counter()
+                    if remaining > SPIN_SECONDS:
+                        # 粗等待，状态变化时会被提前唤醒并重新计算
+                        self._cond.wait(remaining - SPIN_SECONDS)
+                        continue
+                    version = self._version
+
+            if finished:
+                if self.on_finished:
+                    self.on_finished()
+                continue
+
+            # 在锁外等待到计划时间：先短睡，最后一小段才自旋，避免占满CPU和GIL
+            remaining = due - time.perf_counter()
+            while remaining > 0:
+                time.sleep(remaining - SPIN_FINAL_SECONDS if remaining > SPIN_FINAL_SECONDS else 0)
+                remaining = due - time.perf_counter()
+
+            with self._cond:
+                if version != self._version or not self._playing:
+                    continue
+                if wrap:
+                    loop_start = self._loop[0]
+                    self._move_to(loop_start, due)
+                else:
+                    self._send_due_events(due)
+
+    def close(self):
+        """停止线程并关闭输出"""
+        with self._cond:
+            self._closed = True
+            self._playing = False
+            self._release_notes()
+            self._changed()
+        self._thread.join(1.0)
+        self.output.close()
+
+def sequencer_from_env(on_finished: Optional[Callable[[], None]] = None) -> Optional[Sequencer]:
+    """根据环境变量创建实时音序器，未设置或端口无法打开时返回None"""
+    spec = os.environ.get(OUTPUT_ENV)
+    if not spec:
+        return None
+    try:
+        return Sequencer(open_output(spec), on_finished=on_finished)
+    except Exception as e:
+        logger.error(f"无法打开MIDI输出 {spec}: {str(e)}")
+        return None
@@ -2,6 +2,7 @@ import json
 import os
 from typing import Dict, Tuple, Any
 import pygame
+from utils.font_manager import FontManager
 
 class SkinManager:
     def __init__(self, skin_name: str = "default"):
@@ -32,24 +33,5 @@ class SkinManager:
         return tuple(self.config["colors"].get(element, (100, 100, 100)))
     
     def get_font(self, size: int = 24) -> pygame.font.Font:
-        # 强制优先使用能显示中文的字体
-        chinese_fonts = [
-            "Microsoft YaHei",
-            "SimHei",
-            "Arial Unicode MS",
-            "Noto Sans CJK SC",
-            "sans-serif"
-        ]
-        
-        for font_name in chinese_fonts:
-            try:
-                font = pygame.font.SysFont(font_name, size)
-                # 测试中文字符渲染
-                test_surf = font.render("测试", True, (255,255,255))
-                if test_surf.get_width() > 0:
-                    return font
-            except:
-                continue
-        
-        # 最终回退方案
-        return pygame.font.SysFont(None, size)
\ No newline at end of file
+        # 统一由FontManager解析中文字体并缓存
+        return FontManager().get_font(size)
@@ -0,0 +1,121 @@
+# src/smf_writer.py
+import itertools
+import struct
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+from mido import bpm2tempo
+from note_events import NoteEventBuffer
+
+# 常用delta时间的VLQ编码缓存
+_VLQ_CACHE: Dict[int, bytes] = {}
+
+END_OF_TRACK = b'\x00\xFF\x2F\x00'
+
+# 流式写入时每批编码的事件数
+STREAM_BATCH = 1024
+
+def encode_vlq(value: int) -> bytes:
+    """将非负整数编码为MIDI可变长度数值"""
+    encoded = _VLQ_CACHE.get(value)
+    if encoded is not None:
+        return encoded
+    if value < 0:
+        raise ValueError(f"delta时间不能为负数: {value}")
+
+    groups = [value & 0x7F]
+    rest = value >> 7
+    while rest:
+        groups.append((rest & 0x7F) | 0x80)
+        rest >>= 7
+    encoded = bytes(reversed(groups))
+
+    if len(_VLQ_CACHE) < 4096:
+        _VLQ_CACHE[value] = encoded
+    return encoded
+
+def _track_header(bpm: int) -> bytearray:
+    """音色、速度与4/4拍号，与generate_progression_midi写入的开头一致"""
+    data = bytearray(b'\x00\xC0\x00')                                    # program_change 0
+    data += b'\x00\xFF\x51\x03' + bpm2tempo(bpm).to_bytes(3, 'big')    # set_tempo
+    data += b'\x00\xFF\x58\x04\x04\x02\x18\x08'                         # time_signature 4/4
+    return data
+
+def _append_events(data: bytearray, events: Iterable[Tuple[int, int, int, int]],
+                   running_status: Optional[int] = None) -> Optional[int]:
+    """把 (delta, 状态字节, 音高, 力度) 编码追加到data，返回最后的运行状态"""
+    # mido使用运行状态(running status)，meta消息之后需重新写入状态字节
+    for delta, status, note, velocity in events:
+        data += encode_vlq(delta)
+        if status != running_status:
+            data.append(status)
+            running_status = status
+        data.append(note)
+        data.append(velocity)
+    return running_status
+
+def _file_header(ticks_per_beat: int) -> bytes:
+    return b'MThd' + struct.pack('>Lhhh', 6, 1, 1, ticks_per_beat)
+
+def encode_smf(events: NoteEventBuffer, bpm: int = 120, ticks_per_beat: int = 480) -> bytes:
+    """直接将事件缓冲区编码为单音轨标准MIDI文件，输出与mido保存的结果逐字节一致"""
+    data = _track_header(bpm)
+    _append_events(data, events.iter_events())
+    data += END_OF_TRACK
+
+    out = bytearray(_file_header(ticks_per_beat))
+    out += b'MTrk' + struct.pack('>L', len(data))
+    out += data
+    return bytes(out)
+
+def _deltas(timed_events: Iterable[Tuple[int, int, int, int]]) -> Iterator[Tuple[int, int, int, int]]:
+    """把 (绝对tick, 状态字节, 音高, 力度) 转换为delta时间"""
+    prev_tick = 0
+    for tick, status, note, velocity in timed_events:
+        yield tick - prev_tick, status, note, velocity
+        prev_tick = tick
+
+def write_smf_stream(timed_events: Iterable[Tuple[int, int, int, int]], file: BinaryIO,
+                     bpm: int = 120, ticks_per_beat: int = 480) -> int:
+    """边生成边写入标准MIDI文件，内存占用与歌曲长度无关，返回写入的字节数
+
+    timed_events为按时间排序的 (绝对tick, 状态字节, 音高, 力度)，例如event_stream产生的事件。
+    音轨长度在写完后回填，因此file必须可定位。
+    """
+    if not file.seekable():
+        raise ValueError("流式写入需要可定位的文件对象")
+
+    start = file.tell()
+    file.write(_file_header(ticks_per_beat))
+    length_pos = file.tell() + 4
+    file.write(b'MTrk\x00\x00\x00\x00')
+
+    data = _track_header(bpm)
+    track_length = 0
+    running_status = None
+    deltas = _deltas(timed_events)
+    while True:
+        running_status = _append_events(data, itertools.islice(deltas, STREAM_BATCH), running_status)
+        if not data:
+            break
+        file.write(data)
+        track_length += len(data)
+        data = bytearray()
+
+    file.write(END_OF_TRACK)
+    track_length += len(END_OF_TRACK)
+    end = file.tell()
+
+    file.seek(length_pos)
+    file.write(struct.pack('>L', track_length))
+    file.seek(end)
+    return end - start
+
+def write_smf(events: NoteEventBuffer, bpm: int = 120, ticks_per_beat: int = 480,
+              filename: Optional[str] = None, file: Optional[BinaryIO] = None) -> bytes:
+    """编码并写入文件或文件对象，同时返回编码后的字节"""
+    data = encode_smf(events, bpm, ticks_per_beat)
+    if file is not None:
+        file.write(data)
+    elif filename is not None:
+        with open(filename, 'wb') as f:
+            f.write(data)
+    return data
@@ -0,0 +1,326 @@
+# src/song_structure/chord_list.py
+from array import array
+from collections.abc import Mapping, MutableMapping, MutableSequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from constants import CHORD_TYPES, ROMAN_TO_DEGREE
+from custom_types import ChordConfig
+from rhythm.types import RHYTHM_PATTERNS
+
+CHORD_FIELDS = ('roman', 'type', 'inversion', 'duration', 'rhythm')
+
+class _Interned:
+    """字符串与小整数编码的双向表，编码只在当前进程内稳定"""
+    __slots__ = ('names', 'codes')
+
+    def __init__(self, names: Iterable[Optional[str]]):
+        self.names: List[Optional[str]] = []
+        self.codes: Dict[Optional[str], int] = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name: Optional[str]) -> int:
+        """返回名称的编码，未出现过的名称追加到表尾"""
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.names)
+            if code > 0xFF:
+                raise ValueError(f"编码表已满，无法加入: {name}")
+            self.names.append(name)
+            self.codes[name] = code
+        return code
+
+ROMANS = _Interned(ROMAN_TO_DEGREE)
+CHORD_TYPE_CODES = _Interned(CHORD_TYPES)
+RHYTHMS = _Interned([None, *RHYTHM_PATTERNS])   # 编码0表示和弦未指定节奏
+
+# 各字段的驻留表（数值字段为None）与数组类型，顺序与CHORD_FIELDS一致
+_TABLES = (ROMANS, CHORD_TYPE_CODES, None, None, RHYTHMS)
+COLUMN_TYPECODES = ('B', 'B', 'b', 'd', 'B')
+_FIELD_INDEX = {name: i for i, name in enumerate(CHORD_FIELDS)}
+_DURATION = _FIELD_INDEX['duration']
+_RHYTHM = _FIELD_INDEX['rhythm']
+
+# 共享状态下单独记录的改动和弦数下限，超过上限后复制整列
+MIN_PATCH_LIMIT = 32
+
+# 一个和弦编码后的各列: (罗马数字, 和弦类型, 转位, 时值, 节奏)
+ChordCodes = Tuple[int, int, int, float, int]
+
+def _encode(chord: Mapping) -> ChordCodes:
+    return (
+        ROMANS.code(chord['roman']),
+        CHORD_TYPE_CODES.code(chord['type']),
+        chord.get('inversion', 0),
+        float(chord.get('duration', 1.0)),
+        RHYTHMS.code(chord.get('rhythm'))
+    )
+
+class ChordView(MutableMapping):
+    """ChordList中单个和弦的字典兼容视图，读写直接作用于底层数组
+
+    视图绑定的是位置而不是和弦本身，插入或删除前面的和弦后会指向新的内容。
+    """
+    __slots__ = ('_chords', '_index')
+
+    def __init__(self, chords: 'ChordList', index: int):
+        self._chords = chords
+        self._index = index
+
+    def __getitem__(self, key: str):
+        field = _FIELD_INDEX.get(key)
+        if field is None:
+            raise KeyError(key)
+        code = self._chords._code(self._index, field)
+        if field == _RHYTHM and not code:
+            raise KeyError(key)
+        table = _TABLES[field]
+        return table.names[code] if table else code
+
+    def __setitem__(self, key: str, value):
+        field = _FIELD_INDEX.get(key)
+        if field is None:
+            raise KeyError(key)
+        table = _TABLES[field]
+        if table:
+            value = table.code(value)
+        elif field == _DURATION:
+            value = float(value)
+        self._chords._set_code(self._index, field, value)
+
+    def __delitem__(self, key: str):
+        # 只有节奏是可选字段，其余字段始终存在
+        if key != 'rhythm' or not self._chords._code(self._index, _RHYTHM):
+            raise KeyError(key)
+        self._chords._set_code(self._index, _RHYTHM, 0)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from CHORD_FIELDS[:_RHYTHM]
+        if self._chords._code(self._index, _RHYTHM):
+            yield 'rhythm'
+
+    def __len__(self) -> int:
+        return _RHYTHM + bool(self._chords._code(self._index, _RHYTHM))
+
+    def copy(self) -> ChordConfig:
+        """复制为普通字典"""
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+class ChordList(MutableSequence):
+    """按列存储的和弦进行，每个和弦只占几个字节
+
+    罗马数字、和弦类型和节奏保存为驻留表中的小整数，转位和时值保存为数值，
+    下标访问返回ChordView，因此界面和渲染代码仍可按字典读写和弦。
+
+    copy()不复制数据，副本与原对象共用各列（写时复制）：共享期间修改和弦只把
+    该和弦记录到各自的改动表中，改动过多或插入删除时才复制整列。
+    """
+    __slots__ = ('_columns', '_patch', '_shared')
+
+    def __init__(self, chords: Iterable[Mapping] = ()):
+        self._columns: Tuple[array, ...] = tuple(array(typecode) for typecode in COLUMN_TYPECODES)
+        self._patch: Dict[int, ChordCodes] = {}   # 共享期间被修改的和弦: 下标 -> 各列编码
+        self._shared = False                 # 各列是否可能被其他ChordList引用
+        self.extend(chords)
+
+    @classmethod
+    def of(cls, chords: Iterable[Mapping]) -> 'ChordList':
+        """转换为ChordList，已经是ChordList时原样返回"""
+        return chords if isinstance(chords, cls) else cls(chords)
+
+    @classmethod
+    def from_columns(cls, columns: Tuple[array, ...]) -> 'ChordList':
+        """直接使用已编码的各列构造（顺序和类型与CHORD_FIELDS一致），不复制"""
+        chords = cls.__new__(cls)
+        chords._columns = tuple(columns)
+        chords._patch = {}
+        chords._shared = False
+        return chords
+
+    def columns(self) -> Tuple[array, ...]:
+        """合并改动后的各列，用于序列化，调用方不能修改"""
+        return self._merged()
+
+    def __len__(self) -> int:
+        return len(self._columns[0])
+
+    def _position(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("和弦下标越界")
+        return index
+
+    def _code(self, index: int, field: int):
+        if self._patch:
+            chord = self._patch.get(index)
+            if chord is not None:
+                return chord[field]
+        return self._columns[field][index]
+
+    def _can_patch(self, index: int) -> bool:
+        """共享状态下能否把改动记录到改动表，改动过多时改为独占各列并返回False"""
+        if not self._shared:
+            return False
+        if index not in self._patch and len(self._patch) >= max(MIN_PATCH_LIMIT, len(self) // 8):
+            self._own()
+            return False
+        return True
+
+    def _set_code(self, index: int, field: int, value):
+        if self._can_patch(index):
+            chord = list(self.codes(index))
+            chord[field] = value
+            self._patch[index] = tuple(chord)
+        else:
+            self._columns[field][index] = value
+
+    def _merged(self) -> Tuple[array, ...]:
+        """合并改动后的各列，没有改动时直接返回共享的列（调用方不能修改）"""
+        if not self._patch:
+            return self._columns
+        columns = tuple(column[:] for column in self._columns)
+        for index, chord in self._patch.items():
+            for column, value in zip(columns, chord):
+                column[index] = value
+        return columns
+
+    def _own(self):
+        """写入前确保各列为本对象独有"""
+        if self._shared:
+            merged = self._merged()
+            self._columns = merged if merged is not self._columns else tuple(column[:] for column in merged)
+            self._patch = {}
+            self._shared = False
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[ChordView, 'ChordList']:
+        if isinstance(index, slice):
+            chords = ChordList()
+            chords._columns = tuple(column[index] for column in self._merged())
+            return chords
+        return ChordView(self, self._position(index))
+
+    def __setitem__(self, index: Union[int, slice], chord):
+        if isinstance(index, slice):
+            self._own()
+            for column, values in zip(self._columns, ChordList.of(chord)._merged()):
+                column[index] = values
+            return
+        self.set_codes(index, _encode(chord))
+
+    def codes(self, index: int) -> ChordCodes:
+        """和弦的编码元组"""
+        index = self._position(index)
+        chord = self._patch.get(index) if self._patch else None
+        if chord is not None:
+            return chord
+        return tuple(column[index] for column in self._columns)
+
+    def set_codes(self, index: int, codes: ChordCodes):
+        """按编码元组整体替换和弦"""
+        index = self._position(index)
+        if self._can_patch(index):
+            self._patch[index] = tuple(codes)
+        else:
+            for column, value in zip(self._columns, codes):
+                column[index] = value
+
+    def diff(self, other: 'ChordList') -> Optional[List[int]]:
+        """返回与other内容不同的和弦下标，长度不同时返回None
+
+        两者共用各列时只需检查双方的改动表，否则逐列比较。
+        """
+        if len(self) != len(other):
+            return None
+        if self._columns is other._columns:
+            if self._patch == other._patch:
+                return []
+            # 改动表中的编码元组在复制时共用，同一个对象说明该和弦未再改动
+            candidates = sorted(self._patch.keys() | other._patch.keys())
+            return [i for i in candidates
+                    if self._patch.get(i) is not other._patch.get(i) and self.codes(i) != other.codes(i)]
+        changed = set()
+        for mine, theirs in zip(self._merged(), other._merged()):
+            if mine != theirs:
+                changed.update(i for i, (a, b) in enumerate(zip(mine, theirs)) if a != b)
+        return sorted(changed)
+
+    def __delitem__(self, index: Union[int, slice]):
+        if not isinstance(index, slice):
+            index = self._position(index)
+        self._own()
+        for column in self._columns:
+            del column[index]
+
+    def __iter__(self) -> Iterator[ChordView]:
+        return (ChordView(self, i) for i in range(len(self)))
+
+    def insert(self, index: int, chord: Mapping):
+        self._own()
+        for column, value in zip(self._columns, _encode(chord)):
+            column.insert(index, value)
+
+    def append(self, chord: Mapping):
+        self._own()
+        for column, value in zip(self._columns, _encode(chord)):
+            column.append(value)
+
+    def extend(self, chords: Iterable[Mapping]):
+        self._own()
+        if isinstance(chords, ChordList):
+            for column, values in zip(self._columns, chords._merged()):
+                column.extend(values)
+        else:
+            for chord in chords:
+                self.append(chord)
+
+    def pop(self, index: int = -1) -> ChordConfig:
+        """删除并以普通字典返回和弦（视图在删除后会指向别的和弦）"""
+        index = self._position(index)
+        chord = dict(ChordView(self, index))
+        del self[index]
+        return chord
+
+    def reverse(self):
+        self._own()
+        for column in self._columns:
+            column.reverse()
+
+    def copy(self) -> 'ChordList':
+        """O(1)复制：与副本共用各列，之后任一方修改时才复制被改的和弦"""
+        chords = ChordList.from_columns(self._columns)
+        chords._patch = dict(self._patch)
+        chords._shared = self._shared = True
+        return chords
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo) -> 'ChordList':
+        return self.copy()
+
+    def key(self) -> bytes:
+        """内容的紧凑字节表示，可用作字典键或计算哈希
+
+        编码来自进程内的驻留表，不能跨进程保存。
+        """
+        return b''.join(column.tobytes() for column in self._merged())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChordList):
+            if self._columns is other._columns and self._patch == other._patch:
+                return True
+            return self._merged() == other._merged()
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_dicts(self) -> List[ChordConfig]:
+        """转换为普通字典列表"""
+        return [dict(chord) for chord in self]
+
+    def __repr__(self) -> str:
+        return f"ChordList({self.to_dicts()!r})"
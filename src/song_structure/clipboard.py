@@ -1,18 +1,19 @@
-from typing import List, Optional
+from typing import Iterable, Optional
 from custom_types import ChordConfig
+from .chord_list import ChordList
 
 class ChordClipboard:
     def __init__(self):
-        self._data: Optional[List[ChordConfig]] = None
+        self._data: Optional[ChordList] = None
     
-    def copy(self, chords: List[ChordConfig]):
-        """复制和弦进行到剪贴板"""
-        self._data = [chord.copy() for chord in chords]
+    def copy(self, chords: Iterable[ChordConfig]):
+        """复制和弦进行到剪贴板（写时复制，不复制数据）"""
+        self._data = ChordList.of(chords).copy()
     
-    def paste(self) -> Optional[List[ChordConfig]]:
+    def paste(self) -> Optional[ChordList]:
         """从剪贴板粘贴和弦进行"""
         if self._data:
-            return [chord.copy() for chord in self._data]
+            return self._data.copy()
         return None
     
     def has_data(self) -> bool:
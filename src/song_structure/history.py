@@ -0,0 +1,234 @@
+# src/song_structure/history.py
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+from custom_types import SongSection
+from .chord_list import ChordCodes, ChordList
+from .section_manager import SectionManager
+
+# 估算的内存占用：一条和弦改动记录（下标及前后编码元组），ChordList中每个和弦的列存储，
+# 以及段落列表中的一个段落
+CHANGE_BYTES = 160
+CHORD_BYTES = 13
+SECTION_BYTES = 120
+
+@dataclass
+class _SectionEdit:
+    """一个段落的改动：逐个和弦的前后编码，或长度变化时前后两份完整的和弦进行"""
+    section: str
+    changes: List[Tuple[int, ChordCodes, ChordCodes]] = field(default_factory=list)
+    before: Optional[ChordList] = None
+    after: Optional[ChordList] = None
+
+    @property
+    def size(self) -> int:
+        if self.before is not None:
+            return CHORD_BYTES * (len(self.before) + len(self.after))
+        return CHANGE_BYTES * len(self.changes)
+
+@dataclass
+class _SectionListEdit:
+    """段落列表的变化（添加、删除、复制段落）：前后的段落顺序，以及删除和添加的段落
+
+    保存的段落是普通字典，和弦进行为写时复制的副本，与原段落共用存储。
+    """
+    order_before: Tuple[str, ...]
+    order_after: Tuple[str, ...]
+    removed: Dict[str, SongSection]
+    added: Dict[str, SongSection]
+
+    @property
+    def size(self) -> int:
+        sections = list(self.removed.values()) + list(self.added.values())
+        return (SECTION_BYTES * (len(self.order_before) + len(self.order_after))
+                + CHORD_BYTES * sum(len(section['progression']) for section in sections))
+
+@dataclass
+class _Step:
+    label: str
+    edits: List[_SectionEdit]
+    size: int
+    sections: Optional[_SectionListEdit] = None
+    current: Tuple[str, str] = ('', '')     # 步骤前后的当前段落
+
+class EditHistory:
+    """SectionManager的撤销/重做历史
+
+    每次commit把各段落的和弦进行与上次提交时保存的基线比较，只记录内容变化的和弦。
+    基线是写时复制的副本，比较时只需检查改动表；长度变化（如粘贴）时记录前后两份
+    共用存储的ChordList。段落的添加、删除和复制记录为段落列表的变化，撤销时恢复
+    段落顺序和被删除的段落。历史总量超过max_bytes时丢弃最早的步骤。
+    从项目文件中延迟解码的段落以解码出的内容为基线，尚未解码的段落不会因比较而被解码。
+    """
+    def __init__(self, manager: SectionManager, max_bytes: int = 4 * 1024 * 1024):
+        self.manager = manager
+        self.max_bytes = max_bytes
+        self._undo: Deque[_Step] = deque()
+        self._redo: List[_Step] = []
+        self._bytes = 0
+        self._baseline: Dict[str, ChordList] = {}
+        self._sections: Dict[str, SongSection] = {}   # 上次提交时的段落列表（引用）
+        self._current = ''
+        self.reset()
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @property
+    def memory_bytes(self) -> int:
+        """撤销与重做步骤的估算内存占用"""
+        return self._bytes
+
+    def reset(self):
+        """清空历史，以当前状态作为基线"""
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+        self._baseline = {
+            name: section['progression'].copy() for name, section in self.manager.sections.items()
+            if 'progression' in section
+        }
+        self._sections = dict(self.manager.sections)
+        self._current = self.manager.current_section
+
+    def _saved_section(self, name: str, section: SongSection) -> SongSection:
+        """段落的普通字典副本，和弦进行取上次提交时的基线（没有基线时解码）"""
+        progression = self._baseline.get(name)
+        if progression is None:
+            progression = section['progression'].copy()
+        return {**section, 'progression': progression}
+
+    def _diff_section_list(self) -> Optional[_SectionListEdit]:
+        order_before = tuple(self._sections)
+        order_after = tuple(self.manager.sections)
+        if order_before == order_after and all(
+                self.manager.sections[name] is section for name, section in self._sections.items()):
+            return None
+        # 同名段落被替换为另一个字典时视为删除后重新添加
+        removed = {
+            name: self._saved_section(name, section) for name, section in self._sections.items()
+            if self.manager.sections.get(name) is not section
+        }
+        added = {
+            name: {**section, 'progression': section['progression'].copy()}
+            for name, section in self.manager.sections.items()
+            if self._sections.get(name) is not section
+        }
+        for name in removed:
+            self._baseline.pop(name, None)
+        for name, section in added.items():
+            self._baseline[name] = section['progression'].copy()
+        return _SectionListEdit(order_before, order_after, removed, added)
+
+    def _diff_section(self, name: str, progression: ChordList, baseline: ChordList) -> Optional[_SectionEdit]:
+        changed = progression.diff(baseline)
+        if not changed and changed is not None:
+            return None
+        # 改动的和弦很多时（如统一修改节奏），整体保存前后两份更省内存
+        if changed is None or len(changed) * CHANGE_BYTES > CHORD_BYTES * 2 * len(progression):
+            return _SectionEdit(name, before=baseline, after=progression.copy())
+        return _SectionEdit(name, [(i, baseline.codes(i), progression.codes(i)) for i in changed])
+
+    def commit(self, label: str = '') -> bool:
+        """把上次提交以来的改动记为一步，没有改动时返回False"""
+        sections = self._diff_section_list()
+        edits = []
+        for name, section in self.manager.sections.items():
+            if 'progression' not in section:
+                continue
+            progression = section['progression']
+            # 从项目文件延迟载入的段落以解码出的内容为基线，解码后的第一次修改也能撤销
+            baseline = self._baseline.get(name)
+            if baseline is None:
+                baseline = getattr(section, 'decoded_progression', None)
+            if baseline is not None:
+                edit = self._diff_section(name, progression, baseline)
+                if edit is None:
+                    continue
+                edits.append(edit)
+            self._baseline[name] = progression.copy()
+
+        current = (self._current, self.manager.current_section)
+        self._sections = dict(self.manager.sections)
+        self._current = self.manager.current_section
+        if not edits and sections is None:
+            return False
+
+        self._bytes -= sum(step.size for step in self._redo)
+        self._redo.clear()
+        size = sum(edit.size for edit in edits) + (sections.size if sections is not None else 0)
+        step = _Step(label, edits, size, sections, current)
+        self._undo.append(step)
+        self._bytes += step.size
+        while self._bytes > self.max_bytes and len(self._undo) > 1:
+            self._bytes -= self._undo.popleft().size
+        return True
+
+    def _restore_section_list(self, order: Tuple[str, ...], saved: Dict[str, SongSection]):
+        """按order重建段落列表，不在当前列表中的段落从saved恢复（原地修改sections）"""
+        sections = self.manager.sections
+        restored = {}
+        for name in order:
+            section = saved.get(name)
+            if section is None:
+                restored[name] = sections[name]
+            else:
+                restored[name] = {**section, 'progression': section['progression'].copy()}
+                self._baseline[name] = section['progression'].copy()
+        sections.clear()
+        sections.update(restored)
+        for name in list(self._baseline):
+            if name not in sections:
+                del self._baseline[name]
+        self._sections = dict(sections)
+
+    def _apply(self, step: _Step, undo: bool) -> Optional[str]:
+        """应用步骤的前（撤销）或后（重做）状态，返回应切换到的段落名"""
+        section_name = None
+        if step.sections is not None and not undo:
+            self._restore_section_list(step.sections.order_after, step.sections.added)
+        for edit in reversed(step.edits) if undo else step.edits:
+            section = self.manager.sections.get(edit.section)
+            if section is None:
+                continue
+            if edit.before is not None:
+                section['progression'] = (edit.before if undo else edit.after).copy()
+            else:
+                progression = section['progression']
+                for index, before, after in edit.changes:
+                    progression.set_codes(index, before if undo else after)
+            self._baseline[edit.section] = section['progression'].copy()
+            section_name = edit.section
+        if step.sections is not None:
+            if undo:
+                self._restore_section_list(step.sections.order_before, step.sections.removed)
+            current = step.current[0] if undo else step.current[1]
+            if current in self.manager.sections:
+                section_name = current
+            elif section_name not in self.manager.sections:
+                section_name = next(iter(self.manager.sections), None)
+        if section_name is not None:
+            self._current = section_name
+        return section_name
+
+    def undo(self) -> Optional[str]:
+        """撤销一步，返回被修改的段落名；没有可撤销的步骤时返回None"""
+        self.commit()
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._redo.append(step)
+        return self._apply(step, undo=True)
+
+    def redo(self) -> Optional[str]:
+        """重做一步，返回被修改的段落名；没有可重做的步骤时返回None"""
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._undo.append(step)
+        return self._apply(step, undo=False)
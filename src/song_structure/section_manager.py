@@ -1,7 +1,7 @@
 from dataclasses import dataclass
-from typing import Dict, List
-from copy import deepcopy
+from typing import Dict, Iterable
 from custom_types import SongSection, ChordConfig, SectionType
+from .chord_list import ChordList
 
 @dataclass
 class SectionManager:
@@ -18,21 +18,29 @@ class SectionManager:
         self.sections[name] = {
             'name': name,
             'type': section_type,
-            'progression': [],
+            'progression': ChordList(),
             'length': length,
             'bpm': bpm
         }
     
     def duplicate_section(self, source_name: str, new_name: str):
-        """复制段落"""
+        """复制段落，和弦进行与原段落共用存储，直到任一方被修改"""
         if source_name in self.sections:
-            self.sections[new_name] = deepcopy(self.sections[source_name])
-            self.sections[new_name]['name'] = new_name
+            source = self.sections[source_name]
+            self.sections[new_name] = {**source, 'name': new_name, 'progression': source['progression'].copy()}
     
-    def get_current_progression(self) -> List[ChordConfig]:
+    def snapshot(self) -> 'SectionManager':
+        """复制当前的段落列表，和弦进行为写时复制的副本，可交给后台线程渲染"""
+        sections = {
+            name: {**section, 'progression': section['progression'].copy()}
+            for name, section in self.sections.items()
+        }
+        return SectionManager(sections, self.current_section)
+    
+    def get_current_progression(self) -> ChordList:
         """获取当前段落的和弦进行"""
         return self.sections[self.current_section]['progression']
     
-    def set_current_progression(self, progression: List[ChordConfig]):
-        """设置当前段落的和弦进行"""
-        self.sections[self.current_section]['progression'] = progression
\ No newline at end of file
+    def set_current_progression(self, progression: Iterable[ChordConfig]):
+        """设置当前段落的和弦进行，统一保存为ChordList（传入ChordList时直接共用）"""
+        self.sections[self.current_section]['progression'] = ChordList.of(progression)
\ No newline at end of file
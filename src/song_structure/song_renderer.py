@@ -0,0 +1,126 @@
+import io
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from chord_generator import DEFAULT_TICKS_PER_BEAT, render_chord_events
+from custom_types import ChordConfig, ChordStyle
+from event_stream import iter_block_events
+from note_events import NoteEventBuffer
+from smf_writer import write_smf_stream
+from .section_manager import SectionManager
+
+# 决定和弦渲染结果的字段
+ChordKey = Tuple[str, str, int, float, str]
+
+@dataclass
+class _SectionBlock:
+    """一个段落中每个和弦的事件块（从0开始，与其他相同和弦共用）"""
+    chord_keys: List[ChordKey] = field(default_factory=list)
+    blocks: List[NoteEventBuffer] = field(default_factory=list)
+    version: int = 0        # 渲染器内唯一，内容变化时更新
+
+class SongRenderer:
+    """按段落、按和弦缓存渲染结果
+
+    段落只保存各和弦从0开始的事件块，编辑和弦时只替换该和弦的块，后续和弦和段落的
+    事件不需要平移；绝对时间在拼接整首歌曲或编码时才加上。
+    """
+    def __init__(self, key: str = 'C', style: ChordStyle = 'block', rhythm: str = 'straight',
+                 ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT):
+        self.key = key
+        self.style = style
+        self.rhythm = rhythm
+        self.ticks_per_beat = ticks_per_beat
+        self._chord_blocks: Dict[ChordKey, NoteEventBuffer] = {}
+        self._sections: Dict[str, _SectionBlock] = {}
+        self._versions = itertools.count(1)
+        self._song: Optional[Tuple[Tuple, NoteEventBuffer]] = None   # (各段落的版本, 拼接结果)
+
+    def configure(self, key: str, style: ChordStyle, rhythm: str):
+        """更新全局渲染参数，参数变化时清空缓存"""
+        if (key, style, rhythm) != (self.key, self.style, self.rhythm):
+            self.key, self.style, self.rhythm = key, style, rhythm
+            self.invalidate()
+
+    def invalidate(self, section_name: str = None):
+        """清除指定段落或全部缓存"""
+        if section_name is None:
+            self._chord_blocks.clear()
+            self._sections.clear()
+        else:
+            self._sections.pop(section_name, None)
+        self._song = None
+
+    def _chord_key(self, chord: ChordConfig) -> ChordKey:
+        return (
+            chord['roman'],
+            chord['type'],
+            chord.get('inversion', 0),
+            chord.get('duration', 1.0),
+            chord.get('rhythm', self.rhythm)
+        )
+
+    def _chord_block(self, chord: ChordConfig, chord_key: ChordKey) -> NoteEventBuffer:
+        """获取从0开始的单个和弦事件块，相同内容的和弦共用一份"""
+        block = self._chord_blocks.get(chord_key)
+        if block is None:
+            block = NoteEventBuffer()
+            render_chord_events(block, chord, self.key, self.style, self.rhythm, self.ticks_per_beat)
+            self._chord_blocks[chord_key] = block
+        return block
+
+    def _build_section(self, progression: List[ChordConfig]) -> _SectionBlock:
+        section = _SectionBlock()
+        for chord in progression:
+            chord_key = self._chord_key(chord)
+            section.chord_keys.append(chord_key)
+            section.blocks.append(self._chord_block(chord, chord_key))
+        section.version = next(self._versions)
+        return section
+
+    def _section(self, section_name: str, progression: List[ChordConfig]) -> _SectionBlock:
+        section = self._sections.get(section_name)
+        if section is None or len(section.chord_keys) != len(progression):
+            section = self._build_section(progression)
+            self._sections[section_name] = section
+        else:
+            for i, chord in enumerate(progression):
+                self.update_chord(section_name, i, chord)
+        return section
+
+    def update_chord(self, section_name: str, index: int, chord: ChordConfig):
+        """重新渲染段落中的单个和弦，耗时与段落长度无关"""
+        section = self._sections.get(section_name)
+        if section is None or not 0 <= index < len(section.chord_keys):
+            return
+
+        chord_key = self._chord_key(chord)
+        if chord_key == section.chord_keys[index]:
+            return
+
+        section.chord_keys[index] = chord_key
+        section.blocks[index] = self._chord_block(chord, chord_key)
+        section.version = next(self._versions)
+
+    def _song_sections(self, manager: SectionManager) -> List[_SectionBlock]:
+        for name in list(self._sections):
+            if name not in manager.sections:
+                del self._sections[name]
+        return [self._section(name, section['progression']) for name, section in manager.sections.items()]
+
+    def render_song(self, manager: SectionManager) -> NoteEventBuffer:
+        """按段落顺序拼接整首歌曲的事件，没有段落变化时直接返回上次的结果"""
+        sections = self._song_sections(manager)
+        state = tuple(section.version for section in sections)
+        if self._song is None or self._song[0] != state:
+            events = NoteEventBuffer.concat(block for section in sections for block in section.blocks)
+            self._song = (state, events)
+        return self._song[1]
+
+    def render_song_bytes(self, manager: SectionManager, bpm: int = 120) -> bytes:
+        """渲染整首歌曲为标准MIDI文件字节，各和弦块接起来直接编码，不需要先拼接成一个缓冲区"""
+        sections = self._song_sections(manager)
+        out = io.BytesIO()
+        blocks = (block for section in sections for block in section.blocks)
+        write_smf_stream(iter_block_events(blocks), out, bpm, self.ticks_per_beat)
+        return out.getvalue()
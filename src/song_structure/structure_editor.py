@@ -3,12 +3,15 @@ from typing import Dict, List
 from .section_manager import SectionManager
 from .clipboard import ChordClipboard
 from utils.font_manager import FontManager
+from utils.dirty_rect import DirtyTracker
+from utils.text_cache import TextCache
 
-class StructureEditor:
+class StructureEditor(DirtyTracker):
     def __init__(self, rect: pygame.Rect, manager: SectionManager):
         self.rect = rect
         self.manager = manager
         self.clipboard = ChordClipboard()
+        self.text_cache = TextCache()
         
         # UI状态
         self.show_section_menu = False
@@ -44,7 +47,7 @@ class StructureEditor:
         font = FontManager().get_font(20)  # 20是字体大小，可以调整
         
         # 绘制段落标签
-        label = font.render("段落:", True, (255, 255, 255))
+        label = self.text_cache.render(font, "段落:", (255, 255, 255))
         surface.blit(label, (self.rect.x + 10, self.rect.y + 10))
         
         # 绘制段落按钮
@@ -64,5 +67,5 @@ class StructureEditor:
             pygame.draw.rect(surface, color, btn_rect, border_radius=6)
             
             # 绘制按钮文字
-            text = font.render(name[:6], True, (255, 255, 255))
+            text = self.text_cache.render(font, name[:6], (255, 255, 255))
             surface.blit(text, (btn_rect.x + 10, btn_rect.y + 8))
\ No newline at end of file
@@ -3,13 +3,18 @@ import logging
 from typing import List, Dict, Tuple, Optional
 from constants import CHORD_DB
 from utils.font_manager import FontManager
+from utils.dirty_rect import DirtyTracker
+from utils.text_cache import TextCache
 
 logger = logging.getLogger(__name__)
 
-class StyleSelector:
+class StyleSelector(DirtyTracker):
+    tracks_hover = True
+
     def __init__(self, rect: pygame.Rect):
         self.rect = rect
         self.font_manager = FontManager()
+        self.text_cache = TextCache()
         self.expanded = False
         self.selected_style = "日式ACG"
         self.selected_progression = "经典进行1"
@@ -121,7 +126,7 @@ class StyleSelector:
         
         # Draw button text
         font = self.font_manager.get_font(18)
-        text_surf = font.render(text, True, self.colors['text'])
+        text_surf = self.text_cache.render(font, text, self.colors['text'])
         text_rect = text_surf.get_rect(center=rect.center)
         surface.blit(text_surf, text_rect)
 
@@ -154,7 +159,7 @@ class StyleSelector:
                 
                 # Draw option text
                 display_text = style[:14] + ('...' if len(style) > 14 else '')
-                text_surf = font.render(display_text, True, self.colors['text'])
+                text_surf = self.text_cache.render(font, display_text, self.colors['text'])
                 text_rect = text_surf.get_rect(midleft=(rect.x + 10, rect.centery))
                 surface.blit(text_surf, text_rect)
         
@@ -179,6 +184,6 @@ class StyleSelector:
                 
                 # Draw option text
                 display_text = progression[:14] + ('...' if len(progression) > 14 else '')
-                text_surf = font.render(display_text, True, self.colors['text'])
+                text_surf = self.text_cache.render(font, display_text, self.colors['text'])
                 text_rect = text_surf.get_rect(midleft=(rect.x + 10, rect.centery))
                 surface.blit(text_surf, text_rect)
\ No newline at end of file
@@ -0,0 +1,35 @@
+# src/utils/dirty_rect.py
+import pygame
+from typing import List
+
+class DirtyTracker:
+    """UI组件的脏区域记录，只有被标记的组件才需要重绘"""
+    # 鼠标悬停会改变外观的组件设为True
+    tracks_hover = False
+
+    def invalidate(self):
+        """标记组件需要重绘"""
+        self._dirty = True
+
+    @property
+    def dirty(self) -> bool:
+        return getattr(self, '_dirty', True)
+
+    def get_bounds(self) -> pygame.Rect:
+        """组件绘制时可能覆盖的区域（含展开的面板）"""
+        return self.rect
+
+    def pop_dirty_rects(self) -> List[pygame.Rect]:
+        """返回需要重绘的区域（当前区域及上次绘制的区域），并清除脏标记"""
+        if not self.dirty:
+            return []
+
+        bounds = self.get_bounds().copy()
+        rects = [bounds]
+        drawn_bounds = getattr(self, '_drawn_bounds', None)
+        if drawn_bounds is not None and drawn_bounds != bounds:
+            rects.append(drawn_bounds)
+
+        self._drawn_bounds = bounds
+        self._dirty = False
+        return rects
@@ -1,49 +1,101 @@
+import json
+import os
 import pygame
 import logging
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Fonts able to display Chinese, in order of preference
+CHINESE_FONT_NAMES = [
+    'Microsoft YaHei',
+    'SimHei',
+    'PingFang SC',
+    'STHeiti',
+    'WenQuanYi Zen Hei',
+    'Noto Sans CJK SC',
+    'Arial Unicode MS'
+]
+
+# Resolved font paths are kept here so later runs skip system font enumeration
+FONT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.midi_creater', 'font_cache.json')
+
 class FontManager:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._init_fonts()
         return cls._instance
-    
+
     def _init_fonts(self):
-        """Initialize fonts with Chinese support"""
-        self.fonts: Dict[int, pygame.font.Font] = {}
-        font_names = [
-            'Microsoft YaHei',
-            'SimHei',
-            'PingFang SC',
-            'STHeiti',
-            'WenQuanYi Zen Hei',
-            'Noto Sans CJK SC'
-        ]
-        
-        for size in [16, 18, 20, 24, 28]:
-            loaded = False
-            for name in font_names:
-                try:
-                    font = pygame.font.SysFont(name, size)
-                    # Test Chinese character rendering
-                    test_surf = font.render("测试", True, (255,255,255))
-                    if test_surf.get_width() > 0:
-                        self.fonts[size] = font
-                        loaded = True
-                        break
-                except Exception as e:
-                    logger.debug(f"Font {name} not available: {str(e)}")
-                    continue
-            
-            if not loaded:
-                self.fonts[size] = pygame.font.SysFont(None, size)
-                logger.warning(f"Chinese font not found for size {size}, using default")
-    
-    def get_font(self, size: int) -> pygame.font.Font:
-        """Get font with specified size"""
-        return self.fonts.get(size, pygame.font.SysFont(None, size))
\ No newline at end of file
+        """Prepare the font cache; fonts are created on first use"""
+        self.fonts: Dict[Tuple[int, bool], pygame.font.Font] = {}
+        self._paths: Optional[Dict[str, Optional[str]]] = None
+
+    def _load_cached_paths(self) -> Optional[Dict[str, Optional[str]]]:
+        """Read font paths from the disk cache if they are still valid"""
+        try:
+            with open(FONT_CACHE_PATH, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get('names') != CHINESE_FONT_NAMES:
+            return None
+        paths = cached.get('paths', {})
+        # A negative result is not trusted: rescan in case a font was installed since
+        if paths.get('regular') is None:
+            return None
+        for path in paths.values():
+            if path is not None and not os.path.exists(path):
+                return None
+        return {'regular': paths.get('regular'), 'bold': paths.get('bold')}
+
+    def _save_cached_paths(self, paths: Dict[str, Optional[str]]):
+        try:
+            os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+            with open(FONT_CACHE_PATH, 'w', encoding='utf-8') as f:
+                json.dump({'names': CHINESE_FONT_NAMES, 'paths': paths}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.debug(f"Could not write font cache: {str(e)}")
+
+    def _discover_paths(self) -> Dict[str, Optional[str]]:
+        """Find the first installed Chinese font (scans system fonts once)"""
+        for name in CHINESE_FONT_NAMES:
+            regular = pygame.font.match_font(name)
+            if regular:
+                bold = pygame.font.match_font(name, bold=True)
+                logger.debug(f"Using font {name}: {regular}")
+                return {'regular': regular, 'bold': bold}
+
+        logger.warning("Chinese font not found, using default")
+        return {'regular': None, 'bold': None}
+
+    def font_paths(self) -> Dict[str, Optional[str]]:
+        """Resolved font files for regular and bold text (None means pygame default font)"""
+        if self._paths is None:
+            self._paths = self._load_cached_paths()
+            if self._paths is None:
+                self._paths = self._discover_paths()
+                self._save_cached_paths(self._paths)
+        return self._paths
+
+    def get_font(self, size: int, bold: bool = False) -> pygame.font.Font:
+        """Get font with specified size, created once and reused"""
+        font = self.fonts.get((size, bold))
+        if font is None:
+            paths = self.font_paths()
+            path = paths['bold'] if bold else paths['regular']
+            try:
+                font = pygame.font.Font(path, size)
+            except (OSError, pygame.error) as e:
+                logger.warning(f"Font {path} failed to load, using default: {str(e)}")
+                path = None
+                font = pygame.font.Font(None, size)
+            # Synthesize bold when there is no separate bold face
+            if bold and (path is None or path == paths['regular']):
+                font.set_bold(True)
+            self.fonts[(size, bold)] = font
+        return font
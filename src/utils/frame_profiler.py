@@ -0,0 +1,167 @@
+# src/utils/frame_profiler.py
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Deque, Dict, List, Optional
+import pygame
+from utils.dirty_rect import DirtyTracker
+
+logger = logging.getLogger(__name__)
+
+# 设置为非空值时启动即开启性能分析
+PROFILE_ENV = 'MIDI_CREATER_PROFILE'
+# 设置为文件路径时，退出时自动写出JSON跟踪
+TRACE_ENV = 'MIDI_CREATER_TRACE'
+
+_NULL_SECTION = nullcontext()
+
+class _Section:
+    """计时一个代码段，结果累加到当前帧"""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: 'FrameProfiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.name, self.start, time.perf_counter())
+        return False
+
+class FrameProfiler:
+    """主循环的帧分析器：按名称统计每帧耗时，保留滚动百分位并可导出JSON跟踪"""
+    _instance = None
+
+    def __new__(cls, window: int = 240, max_trace_events: int = 100000):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init_profiler(window, max_trace_events)
+        return cls._instance
+
+    def _init_profiler(self, window: int, max_trace_events: int):
+        self.enabled = bool(os.environ.get(PROFILE_ENV))
+        self.trace_path = os.environ.get(TRACE_ENV) or None
+        if self.trace_path:
+            self.enabled = True
+        self.window = window
+        self.frames = 0
+        self._origin = time.perf_counter()
+        self._frame_start: Optional[float] = None
+        self._current: Dict[str, float] = {}
+        self._history: Dict[str, Deque[float]] = {}
+        self._trace: Deque[dict] = deque(maxlen=max_trace_events)
+
+    def toggle(self) -> bool:
+        """切换分析开关，返回新的状态"""
+        self.enabled = not self.enabled
+        self._frame_start = None
+        self._current = {}
+        logger.info(f"帧分析器{'已开启' if self.enabled else '已关闭'}")
+        return self.enabled
+
+    def section(self, name: str):
+        """用于with语句的计时段，关闭时没有额外开销"""
+        if not self.enabled:
+            return _NULL_SECTION
+        return _Section(self, name)
+
+    def _record(self, name: str, start: float, end: float):
+        self._current[name] = self._current.get(name, 0.0) + (end - start)
+        self._trace.append({
+            'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+            'ts': (start - self._origin) * 1e6, 'dur': (end - start) * 1e6
+        })
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame_start = time.perf_counter()
+            self._current = {}
+
+    def end_frame(self):
+        """结束一帧，把本帧各段耗时加入滚动窗口"""
+        if not self.enabled or self._frame_start is None:
+            return
+        self._record('frame', self._frame_start, time.perf_counter())
+        for name, seconds in self._current.items():
+            history = self._history.get(name)
+            if history is None:
+                history = self._history[name] = deque(maxlen=self.window)
+            history.append(seconds)
+        self._frame_start = None
+        self.frames += 1
+
+    def percentiles(self, name: str) -> Dict[str, float]:
+        """指定段在滚动窗口内的p50/p95/p99/max（毫秒）"""
+        samples = sorted(self._history.get(name, ()))
+        if not samples:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        def pick(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+        return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': samples[-1] * 1000}
+
+    def names(self) -> List[str]:
+        """已记录的段名称，frame排在最前"""
+        return sorted(self._history, key=lambda name: (name != 'frame', name))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """所有段的百分位统计"""
+        return {name: self.percentiles(name) for name in self.names()}
+
+    def dump_trace(self, path: Optional[str] = None) -> str:
+        """写出Chrome跟踪格式的JSON（可用chrome://tracing或Perfetto打开）"""
+        path = path or self.trace_path or 'frame_trace.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'traceEvents': list(self._trace),
+                'displayTimeUnit': 'ms',
+                'summary': self.summary()
+            }, f)
+        logger.info(f"帧跟踪已写入: {path}")
+        return path
+
+class ProfilerOverlay(DirtyTracker):
+    """在屏幕上显示帧分析器的滚动百分位"""
+    LINE_HEIGHT = 16
+    COLUMNS = ('p50', 'p95', 'p99')
+    COLUMN_WIDTH = 60
+    NAME_WIDTH = 150
+
+    def __init__(self, pos: tuple, font: pygame.font.Font, profiler: FrameProfiler = None):
+        self.profiler = profiler or FrameProfiler()
+        self.font = font
+        self.rect = pygame.Rect(pos, (self.NAME_WIDTH + self.COLUMN_WIDTH * len(self.COLUMNS) + 12,
+                                      self.LINE_HEIGHT + 8))
+
+    def get_bounds(self) -> pygame.Rect:
+        # 高度随已记录的段数增长，需在计算脏区域前更新
+        self.rect.height = (len(self.profiler.names()) + 1) * self.LINE_HEIGHT + 8
+        return self.rect
+
+    def _rows(self) -> List[List[str]]:
+        rows = [['ms'] + list(self.COLUMNS)]
+        for name, stats in self.profiler.summary().items():
+            rows.append([name] + [f"{stats[column]:.2f}" for column in self.COLUMNS])
+        return rows
+
+    def draw(self, surface: pygame.Surface):
+        rows = self._rows()
+        background = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        background.fill((0, 0, 0, 180))
+        surface.blit(background, self.rect)
+
+        # 数值每帧都在变化，直接渲染而不占用文字缓存
+        for i, row in enumerate(rows):
+            y = self.rect.y + 4 + i * self.LINE_HEIGHT
+            surface.blit(self.font.render(row[0], True, (120, 255, 120)), (self.rect.x + 6, y))
+            for j, cell in enumerate(row[1:]):
+                text = self.font.render(cell, True, (120, 255, 120))
+                right = self.rect.x + 6 + self.NAME_WIDTH + (j + 1) * self.COLUMN_WIDTH
+                surface.blit(text, (right - text.get_width(), y))
@@ -0,0 +1,92 @@
+# src/utils/startup_bench.py
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 生成核心，必须能在不加载pygame的情况下导入
+HEADLESS_MODULES = [
+    'constants',
+    'chord_generator',
+    'rhythm.types',
+    'rhythm.handler',
+    'song_structure.chord_list',
+    'song_structure.section_manager',
+    'song_structure.song_renderer',
+    'song_structure.history',
+    'batch_render',
+    'render_worker',
+    'sequencer',
+    'event_stream',
+    'project_file',
+    'edit_journal'
+]
+
+# 图形界面模块，作为对照
+GUI_MODULES = HEADLESS_MODULES + [
+    'rhythm.editor',
+    'visualizer',
+    'grid_editor',
+    'style_selector',
+    'song_structure.structure_editor'
+]
+
+# 在全新的解释器中导入模块并报告耗时、内存峰值以及是否加载了pygame
+_PROBE = '''
+import json, sys, time, tracemalloc
+trace = {trace}
+if trace:
+    tracemalloc.start()
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+peak = tracemalloc.get_traced_memory()[1] if trace else 0
+print(json.dumps({{"seconds": elapsed, "peak_bytes": peak, "pygame": "pygame" in sys.modules}}))
+'''
+
+def _run_probe(modules: List[str], trace: bool) -> Dict:
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1', SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    output = subprocess.run(
+        [sys.executable, '-c', _PROBE.format(modules=modules, trace=trace)],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure(modules: List[str], repeat: int = 5) -> Dict:
+    """测量导入耗时（取多次最小值）和导入期间的内存峰值"""
+    timings = [_run_probe(modules, trace=False) for _ in range(repeat)]
+    memory = _run_probe(modules, trace=True)
+    return {
+        'seconds': min(t['seconds'] for t in timings),
+        'peak_bytes': memory['peak_bytes'],
+        'pygame': any(t['pygame'] for t in timings)
+    }
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="测量生成核心与图形界面的启动开销")
+    parser.add_argument('--repeat', type=int, default=5, help="每组测量的重复次数")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    args = parser.parse_args(argv)
+
+    results = {
+        'headless': measure(HEADLESS_MODULES, args.repeat),
+        'gui': measure(GUI_MODULES, args.repeat)
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"{name:>8}: {result['seconds'] * 1000:7.1f} ms, "
+                  f"峰值内存 {result['peak_bytes'] / 1024:8.1f} KiB, pygame={'是' if result['pygame'] else '否'}")
+
+    # 生成核心意外加载pygame时返回失败，便于在CI中使用
+    return 1 if results['headless']['pygame'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+# src/utils/text_cache.py
+import pygame
+from collections import OrderedDict
+from typing import Dict, Tuple
+from utils.frame_profiler import FrameProfiler
+
+Color = Tuple[int, ...]
+
+class TextCache:
+    """文字渲染结果的共享缓存，相同的(字体, 字号, 文字, 颜色)只光栅化一次"""
+    _instance = None
+
+    def __new__(cls, max_entries: int = 1024):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init_cache(max_entries)
+        return cls._instance
+
+    def _init_cache(self, max_entries: int):
+        self.max_entries = max_entries
+        self._surfaces: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.profiler = FrameProfiler()
+
+    def render(self, font: pygame.font.Font, text: str, color: Color,
+               antialias: bool = True) -> pygame.Surface:
+        """返回渲染好的文字表面，调用方只能blit，不能修改返回的表面"""
+        # 字体对象本身包含字族和字号，按对象区分即可
+        cache_key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(cache_key)
+        if surface is not None:
+            self._surfaces.move_to_end(cache_key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        with self.profiler.section('font.render'):
+            surface = font.render(text, antialias, color)
+        self._surfaces[cache_key] = surface
+        while len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def stats(self) -> Dict[str, int]:
+        """命中/未命中计数与当前条目数"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._surfaces)}
+
+    def clear(self):
+        """清空缓存（例如更换字体或皮肤后）"""
+        self._surfaces.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,8 +1,14 @@
 import pygame
-from typing import List
+from typing import List, Optional, Set, Tuple
 from utils.font_manager import FontManager
+from utils.dirty_rect import DirtyTracker
+from utils.text_cache import TextCache
 
-class PianoRoll:
+class PianoRoll(DirtyTracker):
+    BLACK_KEYS = frozenset([1, 3, 6, 8, 10])
+    HIGHLIGHT_COLOR = (255, 100, 100)
+    BORDER_COLOR = (30, 30, 30)
+    
     def __init__(self, rect: pygame.Rect, start_note: int = 36, end_note: int = 84):
         self.rect = rect
         self.start_note = start_note
@@ -10,58 +16,83 @@ class PianoRoll:
         self.visible_notes = end_note - start_note
         self.key_width = rect.width / self.visible_notes
         self.chord_notes: List[int] = []
+        self._highlighted: Set[int] = set()
         
         # 初始化音符颜色
         self.note_colors = {}
         for note in range(start_note, end_note):
-            if note % 12 in [1, 3, 6, 8, 10]:
+            if note % 12 in self.BLACK_KEYS:
                 self.note_colors[note] = (50, 50, 50)
             else:
                 self.note_colors[note] = (220, 220, 220)
         
         # 字体管理
         self.font_manager = FontManager()
+        self.text_cache = TextCache()
+        
+        # 预渲染的键盘背景及按键区域表（相对于self.rect），尺寸变化时重建
+        self._keyboard: Optional[pygame.Surface] = None
+        self.key_rects: List[pygame.Rect] = []
+        self._labels: List[Tuple[pygame.Surface, Tuple[int, int]]] = []
 
     def update(self, notes: List[int]):
         """更新当前显示的和弦音符"""
-        self.chord_notes = notes
+        if notes != self.chord_notes:
+            self.chord_notes = notes
+            self._highlighted = set(notes)
+            self.invalidate()
 
-    def draw(self, surface: pygame.Surface):
-        pygame.draw.rect(surface, (40, 40, 40), self.rect)
+    def _build_keyboard(self, target: pygame.Surface):
+        """按当前尺寸预渲染全部琴键和八度标签"""
+        self.key_width = self.rect.width / self.visible_notes
+        self._keyboard = pygame.Surface(self.rect.size, 0, target)
+        self._keyboard.fill((40, 40, 40))
         
+        self.key_rects = []
         for i, note in enumerate(range(self.start_note, self.end_note)):
-            rect = pygame.Rect(
-                self.rect.x + i * self.key_width,
-                self.rect.y,
-                self.key_width,
-                self.rect.height
-            )
-            
-            if note in self.chord_notes:
-                color = (255, 100, 100)
-            else:
-                color = self.note_colors[note]
-                
-            pygame.draw.rect(surface, color, rect)
-            pygame.draw.rect(surface, (30, 30, 30), rect, 1)
+            rect = pygame.Rect(i * self.key_width, 0, self.key_width, self.rect.height)
+            self.key_rects.append(rect)
+            pygame.draw.rect(self._keyboard, self.note_colors[note], rect)
+            pygame.draw.rect(self._keyboard, self.BORDER_COLOR, rect, 1)
         
+        # 最左端以外每个C键的八度标签；标签画在高亮之上，因此单独保存，绘制时最后贴上
         font = self.font_manager.get_font(16)
-        for i, note in enumerate([48, 60, 72, 84]):
-            text = font.render(f"C{note//12 - 1}", True, (200, 200, 200))
-            pos_x = (note - self.start_note) * self.key_width
-            surface.blit(text, (self.rect.x + pos_x + 5, self.rect.y + 10))
+        self._labels = []
+        for note in range(self.start_note + 1, self.end_note):
+            if note % 12 == 0:
+                text = self.text_cache.render(font, f"C{note//12 - 1}", (200, 200, 200))
+                pos_x = (note - self.start_note) * self.key_width
+                self._labels.append((text, (int(pos_x) + 5, 10)))
+
+    def draw(self, surface: pygame.Surface):
+        if self._keyboard is None or self._keyboard.get_size() != self.rect.size:
+            self._build_keyboard(surface)
+        
+        surface.blit(self._keyboard, self.rect)
+        
+        for note in self._highlighted:
+            if self.start_note <= note < self.end_note:
+                rect = self.key_rects[note - self.start_note].move(self.rect.topleft)
+                pygame.draw.rect(surface, self.HIGHLIGHT_COLOR, rect)
+                pygame.draw.rect(surface, self.BORDER_COLOR, rect, 1)
+        
+        for text, (x, y) in self._labels:
+            surface.blit(text, (self.rect.x + x, self.rect.y + y))
 
-class ChordPreview:
+class ChordPreview(DirtyTracker):
     def __init__(self, rect: pygame.Rect):
         self.rect = rect
         self.chord_name = ""
         self.chord_notes: List[int] = []
         self.font_manager = FontManager()
+        self.text_cache = TextCache()
     
     def update(self, chord_name: str, notes: List[int]):
         """更新显示的和弦信息"""
-        self.chord_name = chord_name
-        self.chord_notes = notes.copy()  # 使用副本避免外部修改影响
+        if chord_name != self.chord_name or notes != self.chord_notes:
+            self.chord_name = chord_name
+            self.chord_notes = notes.copy()  # 使用副本避免外部修改影响
+            self.invalidate()
     
     def draw(self, surface: pygame.Surface):
         """绘制和弦预览区域"""
@@ -69,7 +100,7 @@ class ChordPreview:
         
         # 显示和弦名称
         font = self.font_manager.get_font(28)
-        text = font.render(self.chord_name, True, (255, 255, 255))
+        text = self.text_cache.render(font, self.chord_name, (255, 255, 255))
         surface.blit(text, (self.rect.x + 20, self.rect.y + 20))
         
         # 显示音符名称
@@ -82,5 +113,5 @@ class ChordPreview:
         
         notes_text = ", ".join(note_labels)
         font = self.font_manager.get_font(20)
-        text = font.render(notes_text, True, (200, 200, 230))
+        text = self.text_cache.render(font, notes_text, (200, 200, 230))
         surface.blit(text, (self.rect.x + 20, self.rect.y + 60))
\ No newline at end of file
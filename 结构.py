@@ -7,11 +7,23 @@ midi_creater
 │   │   └── types.py
 │   ├── song_structure/          # 新增目录
 │   │   ├── __init__.py
+│   │   ├── chord_list.py        # 按列存储的紧凑和弦进行
 │   │   ├── section_manager.py   # 段落管理核心逻辑
 │   │   ├── clipboard.py         # 剪贴板功能
+│   │   ├── history.py           # 撤销/重做历史
+│   │   ├── song_renderer.py     # 按段落/和弦增量渲染
 │   │   └── structure_editor.py  # 段落编辑器UI
 │   ├── main_app.py
+│   ├── batch_render.py
 │   ├── chord_generator.py
+│   ├── note_events.py
+│   ├── smf_writer.py
+│   ├── event_stream.py
+│   ├── render_cache.py
+│   ├── render_worker.py
+│   ├── sequencer.py
+│   ├── project_file.py
+│   ├── edit_journal.py
 │   ├── visualizer.py
 │   ├── skin_manager.py
 │   ├── grid_editor.py
@@ -22,6 +34,10 @@ midi_creater
 │   └── utils
 │       ├──__init__.py
 │       ├── debug_tools.py
+│       ├── dirty_rect.py
+│       ├── startup_bench.py
+│       ├── text_cache.py
+│       ├── frame_profiler.py
 │       └── font_manager.py
 ├── docs/                 # 文档
 │   └── design.md         # 设计文档